@@ -0,0 +1,528 @@
+from array import array
+from typing import Iterable, Hashable, Any, Dict, Optional, Tuple
+
+from grapresso.backends.api import DataBackend, NodeAlreadyExistsError, EdgeAlreadyExistsError
+from grapresso.components.edge import Edge
+from grapresso.components.node import Node
+
+LINEAR_SEARCH_MAX_DEGREE = 16
+REMOVED = -1  # Source of removed edges (tombstones) in the edge columns of `CsrBackend`
+
+
+class CsrEdge:
+    """Lightweight view of the edge at position `pos` of the edge columns (nothing is copied).
+
+    Duck-types grapresso's `Edge` API (and is registered as its virtual subclass) instead of inheriting from it,
+    because `Edge` has no `__slots__` and would give every view a `__dict__`.
+    """
+    __slots__ = ('_csr', '_from_index', '_pos')
+
+    def __init__(self, csr: 'CsrView', from_index: int, pos: int):
+        self._csr = csr
+        self._from_index = from_index
+        self._pos = pos
+
+    @property
+    def from_node(self) -> 'CsrNode':
+        return self._csr._nodes[self._from_index]
+
+    @property
+    def to_node(self) -> 'CsrNode':
+        return self._csr._nodes[self._csr.targets[self._pos]]
+
+    @property
+    def u(self) -> 'CsrNode':
+        return self.from_node
+
+    @property
+    def v(self) -> 'CsrNode':
+        return self.to_node
+
+    @property
+    def cost(self) -> float:
+        return self._csr.costs[self._pos]
+
+    @cost.setter
+    def cost(self, cost):
+        self._csr.check_writable()
+        self._csr.costs[self._pos] = cost
+
+    @property
+    def capacity(self) -> float:
+        return self._csr.capacities[self._pos]
+
+    @capacity.setter
+    def capacity(self, cap):
+        self._csr.check_writable()
+        self._csr.capacities[self._pos] = cap
+
+    def opposite(self, of_node) -> 'CsrNode':
+        return self.from_node if of_node == self.to_node else self.to_node
+
+    def inverse(self) -> 'CsrEdge':
+        return self._csr._nodes[self._csr.targets[self._pos]].edge(self._csr._nodes[self._from_index])
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        return {'cost': self.cost, 'capacity': self.capacity}
+
+    @property
+    def key(self) -> Hashable:
+        return self.from_node, self.to_node
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return self.__class__ is other.__class__ and other.key == self.key
+
+    def __lt__(self, other):
+        return self.cost < other.cost
+
+    def __gt__(self, other):
+        return self.cost > other.cost
+
+    def __getitem__(self, item):
+        return self.data[item]
+
+    def __setitem__(self, key, value):
+        if key not in ('cost', 'capacity'):
+            raise KeyError(f"The CSR backend only stores the edge attributes 'cost' and 'capacity', got: {key}")
+        setattr(self, key, value)
+
+    def __getattr__(self, item):
+        # Like Edge, unknown (algorithm-specific) attributes are None:
+        if item.startswith('__'):
+            raise AttributeError(item)
+        return None
+
+    def __str__(self):
+        return f"{self.from_node} ➔ {self.to_node}"
+
+    def __repr__(self):
+        return f"{repr(self.from_node)} ➔ {repr(self.to_node)} " \
+               f"(${self.cost}{f', ^{self.capacity}' if self.capacity != 0 else ''})"
+
+
+Edge.register(CsrEdge)
+
+
+class CsrNode:
+    """Lightweight view of the node with index `index` (0..n-1).
+
+    Duck-types grapresso's `Node` API instead of inheriting from it, because `Node` has no `__slots__`.
+    """
+    __slots__ = ('_csr', '_index', '_name')
+
+    def __init__(self, csr: 'CsrView', index: int, name: Hashable = None):
+        self._csr = csr
+        self._index = index
+        self._name = index if name is None else name
+
+    @property
+    def name(self) -> Hashable:
+        return self._name
+
+    @property
+    def balance(self) -> float:
+        return self._csr.balances[self._index]
+
+    @property
+    def is_source(self) -> bool:
+        return self.balance > 0.0
+
+    @property
+    def is_sink(self) -> bool:
+        return self.balance < 0.0
+
+    @property
+    def edges(self) -> Iterable[CsrEdge]:
+        return [CsrEdge(self._csr, self._index, pos) for pos in self._csr.positions(self._index)]
+
+    @property
+    def neighbours(self) -> Iterable['CsrNode']:
+        nodes, targets = self._csr._nodes, self._csr.targets
+        return [nodes[targets[pos]] for pos in self._csr.positions(self._index)]
+
+    def edge(self, neighbour_node) -> CsrEdge:
+        pos = self._csr.find_position(self._index, neighbour_node)
+        if pos is None:
+            raise KeyError(f"There is no neighbour '{neighbour_node}' accessible from node '{self}'!")
+        return CsrEdge(self._csr, self._index, pos)
+
+    def connect(self, edge):
+        raise TypeError("Connect nodes via the backend's add_edge.")
+
+    def sorted_edges(self) -> Iterable[CsrEdge]:
+        return sorted(self.edges, key=lambda e: e.cost)
+
+    def __getitem__(self, item):
+        return self.edge(item)
+
+    def __str__(self):
+        return f"{self._name}"
+
+    def __repr__(self):
+        return f"{repr(self._name)}"
+
+    def __hash__(self):
+        return hash(self._name)
+
+    def __eq__(self, other):
+        return self._name == other
+
+    def __lt__(self, other):
+        return self.balance < other.balance
+
+
+class CsrView(DataBackend):
+    """Read-only backend over a graph in compressed sparse row (CSR) form:
+    The outgoing edges of node i are stored at the positions offsets[i]..offsets[i + 1] - 1
+    of the contiguous targets, costs and capacities columns.
+
+    The columns can be anything indexable (e.g. arrays or memoryviews of shared memory), they are never copied.
+    Node names are the indices 0..n-1. Symmetric edges are stored in both directions.
+
+    Edge lookups (`CsrNode.edge`) scan the edges of nodes with up to `LINEAR_SEARCH_MAX_DEGREE` edges, and otherwise
+    binary-search a lookup index, the edge positions of every node sorted by target.
+    It is built on the first such lookup and needs another 8 bytes per edge.
+    """
+
+    read_only = True
+
+    def __init__(self, offsets, targets, costs, capacities, balances):
+        self.offsets = offsets
+        self.targets = targets
+        self.costs = costs
+        self.capacities = capacities
+        self.balances = balances
+        self._nodes = [CsrNode(self, i) for i in range(len(offsets) - 1)]
+        self._lookup = None
+
+    def __getitem__(self, node_name: Hashable) -> CsrNode:
+        if isinstance(node_name, int) and node_name >= 0:
+            try:
+                return self._nodes[node_name]
+            except IndexError:
+                pass
+        raise KeyError(node_name)
+
+    def __contains__(self, node_name: Hashable) -> bool:
+        return isinstance(node_name, int) and 0 <= node_name < len(self._nodes)
+
+    def __iter__(self) -> Iterable[CsrNode]:
+        return iter(self._nodes)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of stored edges (symmetric edges count twice)."""
+        return len(self.targets)
+
+    def positions(self, index: int) -> Iterable[int]:
+        """Positions of the outgoing edges of the node with the given index in the edge columns."""
+        return range(self.offsets[index], self.offsets[index + 1])
+
+    def node_index(self, node) -> Optional[int]:
+        """Index of a node given by its view or name, None if it is not part of the graph."""
+        if isinstance(node, CsrNode) and node._csr is self:
+            return node._index
+        name = node.name if isinstance(node, (CsrNode, Node)) else node
+        return name if name in self else None
+
+    def find_position(self, index: int, neighbour) -> Optional[int]:
+        """Position of the (first) edge from the node with the given index to neighbour (a node or node name),
+        None if there is no such edge.
+        """
+        target = self.node_index(neighbour)
+        return None if target is None else self._find(index, target)
+
+    def _find(self, index: int, target: int) -> Optional[int]:
+        lo, end = self.offsets[index], self.offsets[index + 1]
+        targets = self.targets
+        if end - lo <= LINEAR_SEARCH_MAX_DEGREE:
+            # Scanning a few edges is cheaper than building (and searching) the lookup index:
+            return next((pos for pos in self._indexed_positions(index) if targets[pos] == target), None)
+        if self._lookup is None:
+            self._build_lookup()
+        lookup = self._lookup
+        hi = end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if targets[lookup[mid]] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lookup[lo] if lo < end and targets[lookup[lo]] == target else None
+
+    def _indexed_positions(self, index: int) -> Iterable[int]:
+        # The positions covered by the CSR index (without any pending changes):
+        return range(self.offsets[index], self.offsets[index + 1])
+
+    def _build_lookup(self):
+        # Stable, so parallel edges keep their order and the first one is found:
+        lookup, targets = array('q'), self.targets
+        for i in range(len(self._nodes)):
+            lookup.extend(sorted(self._indexed_positions(i), key=targets.__getitem__))
+        self._lookup = lookup
+
+    def check_writable(self):
+        if self.read_only:
+            raise TypeError("CSR graph views are read-only.")
+
+    def add_node(self, node_name: Hashable, **attributes):
+        raise TypeError("CSR graph views are read-only.")
+
+    def add_edge(self, from_node_name: Hashable, to_node_name: Hashable, symmetric: bool = False, **attributes):
+        raise TypeError("CSR graph views are read-only.")
+
+    def remove_edge(self, from_node_name: Hashable, to_node_name: Hashable):
+        raise TypeError("CSR graph views are read-only.")
+
+    def remove_node(self, node_name: Hashable):
+        raise TypeError("CSR graph views are read-only.")
+
+    def node_names(self) -> Iterable[Hashable]:
+        return range(len(self._nodes))
+
+    def edges(self) -> Iterable[Edge]:
+        return [CsrEdge(self, i, pos) for i in range(len(self._nodes)) for pos in self.positions(i)]
+
+    @property
+    def mst_alg_hint(self) -> str:
+        return 'kruskal'
+
+    @property
+    def costminflow_alg_hint(self) -> str:
+        return 'successive-shortest-path'
+
+    @property
+    def data(self) -> Any:
+        return self.offsets, self.targets, self.costs, self.capacities, self.balances
+
+
+class CsrBackend(CsrView):
+    """Mutable backend that stores the whole graph in a few contiguous typed arrays instead of objects per node/edge:
+    Edges are appended to the source, target, cost and capacity columns in insertion order.
+    The CSR index (offsets and the edge positions ordered by from-node) is rebuilt by `add_edges_from`.
+
+    Single changes (e.g. of a delta, see `mmi_delta`) are batched instead of rebuilding the index every time:
+    Removed edges stay in the columns as tombstones and added edges are looked up in a map of pending edges,
+    until `flush` splices them into the index of the changed nodes only. The columns are compacted (and the index
+    rebuilt) once tombstones make up half of them, which changes the positions of the remaining edges.
+
+    Node and edge objects are only created as lightweight `__slots__` views.
+    Symmetric edges are stored in both directions (like `Trait.OPTIMIZE_PERFORMANCE`), symmetric self-loops once.
+    Parallel edges are rejected with an `EdgeAlreadyExistsError`.
+    """
+    read_only = False
+
+    def __init__(self):
+        super().__init__(array('q', [0]), array('q'), array('d'), array('d'), array('d'))
+        self.sources = array('q')
+        self._edge_positions = array('q')
+        self._name_to_index = {}
+        self._added = {}  # (from index, to index) -> position, of the edges added since the last flush
+        self._changed = set()  # Indices of the nodes whose edges changed since the last flush
+        self._tombstones = 0
+
+    def __getitem__(self, node_name: Hashable) -> CsrNode:
+        return self._nodes[self._name_to_index[node_name]]
+
+    def node_index(self, node) -> Optional[int]:
+        if isinstance(node, CsrNode) and node._csr is self:
+            return node._index
+        return self._name_to_index.get(node.name if isinstance(node, (CsrNode, Node)) else node)
+
+    def __contains__(self, node_name: Hashable) -> bool:
+        return node_name in self._name_to_index
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.sources) - self._tombstones
+
+    def positions(self, index: int) -> Iterable[int]:
+        self.flush()
+        return self._edge_positions[self.offsets[index]:self.offsets[index + 1]]
+
+    def _indexed_positions(self, index: int) -> Iterable[int]:
+        return self._edge_positions[self.offsets[index]:self.offsets[index + 1]]
+
+    def _find(self, index: int, target: int) -> Optional[int]:
+        pos = self._added.get((index, target))
+        if pos is None:
+            pos = super()._find(index, target)
+            if pos is not None and self.sources[pos] == REMOVED:
+                return None
+        return pos
+
+    def flush(self):
+        """Applies the edges added and removed one at a time since the last call to the CSR index.
+        Only the edge positions of the changed nodes are rebuilt, all others are copied in bulk.
+        Happens on the next read of edge positions, call it to pay for it right away (e.g. at the end of a delta).
+        """
+        if not self._changed:
+            return
+        if self._tombstones * 2 > len(self.sources):
+            self._rebuild_index()
+            return
+        sources, targets, offsets = self.sources, self.targets, self.offsets
+        added = {}
+        for (u, _), pos in self._added.items():
+            added.setdefault(u, []).append(pos)
+
+        edge_positions, lookup = array('q'), None if self._lookup is None else array('q')
+        growth = {}
+        copied = 0
+        for u in sorted(self._changed):
+            lo, hi = offsets[u], offsets[u + 1]
+            positions = [pos for pos in self._edge_positions[lo:hi] if sources[pos] != REMOVED] + added.get(u, [])
+            edge_positions.extend(self._edge_positions[copied:lo])
+            edge_positions.extend(positions)
+            if lookup is not None:
+                lookup.extend(self._lookup[copied:lo])
+                lookup.extend(sorted(positions, key=targets.__getitem__))
+            growth[u] = len(positions) - (hi - lo)
+            copied = hi
+        edge_positions.extend(self._edge_positions[copied:])
+        if lookup is not None:
+            lookup.extend(self._lookup[copied:])
+
+        shift = 0
+        for i in range(min(growth), len(offsets) - 1):
+            shift += growth.get(i, 0)
+            offsets[i + 1] += shift
+        self._edge_positions, self._lookup = edge_positions, lookup
+        self._clear_changes()
+
+    def _rebuild_index(self):
+        if self._tombstones:
+            self._compact()
+        # Stable counting sort of the edge positions by from-node (keeps the insertion order per node):
+        offsets = array('q', [0]) * (len(self._nodes) + 1)
+        for source in self.sources:
+            offsets[source + 1] += 1
+        for i in range(len(self._nodes)):
+            offsets[i + 1] += offsets[i]
+        next_positions = array('q', offsets)
+        edge_positions = array('q', [0]) * len(self.sources)
+        for pos, source in enumerate(self.sources):
+            edge_positions[next_positions[source]] = pos
+            next_positions[source] += 1
+        self.offsets, self._edge_positions, self._lookup = offsets, edge_positions, None
+        self._clear_changes()
+
+    def _clear_changes(self):
+        self._added.clear()
+        self._changed.clear()
+
+    def _compact(self):
+        live = [pos for pos, source in enumerate(self.sources) if source != REMOVED]
+        self.sources, self.targets, self.costs, self.capacities = (
+            array(column.typecode, map(column.__getitem__, live))
+            for column in (self.sources, self.targets, self.costs, self.capacities))
+        self._tombstones = 0
+
+    def add_node(self, node_name: Hashable, balance: float = 0.0, **attributes):
+        if node_name in self._name_to_index:
+            raise NodeAlreadyExistsError(node_name)
+        if attributes:
+            raise TypeError("The CSR backend only stores the node attribute 'balance', got: {}".format(
+                ", ".join(attributes)))
+        index = len(self._nodes)
+        self._name_to_index[node_name] = index
+        self._nodes.append(CsrNode(self, index, node_name))
+        self.balances.append(balance or 0.0)
+        self.offsets.append(self.offsets[-1])
+
+    def add_edge(self, from_node_name: Hashable, to_node_name: Hashable, symmetric: bool = False,
+                 cost: float = None, capacity: float = None, **attributes):
+        if attributes:
+            raise TypeError("The CSR backend only stores the edge attributes 'cost' and 'capacity', got: {}".format(
+                ", ".join(attributes)))
+        u, v = self._name_to_index[from_node_name], self._name_to_index[to_node_name]
+        directions = ((u, v), (v, u)) if symmetric and u != v else ((u, v),)
+        for a, b in directions:
+            if self._find(a, b) is not None:
+                raise EdgeAlreadyExistsError(self._nodes[a].name, self._nodes[b].name)
+        cost, capacity = cost or 0.0, capacity or 0.0
+        for a, b in directions:
+            self._added[a, b] = len(self.sources)
+            self._changed.add(a)
+            self._append(a, b, cost, capacity)
+
+    def _append(self, u, v, cost, capacity):
+        self.sources.append(u)
+        self.targets.append(v)
+        self.costs.append(cost)
+        self.capacities.append(capacity)
+
+    def add_edges_from(self, edges: Iterable, symmetric: bool = False):
+        """Bulk version of `add_edge` for (from_node_name, to_node_name, cost, capacity) tuples,
+        rebuilds the whole index once. If any edge already exists, none of them are added.
+
+        Raises:
+            EdgeAlreadyExistsError: If an edge exists already (or is contained twice).
+        """
+        if self._tombstones:
+            self._rebuild_index()  # Compacts the columns, so the new edges can be cut off again
+        start = len(self.sources)
+        name_to_index = self._name_to_index
+        sources, targets, costs, capacities = self.sources, self.targets, self.costs, self.capacities
+        for from_node_name, to_node_name, cost, capacity in edges:
+            u, v = name_to_index[from_node_name], name_to_index[to_node_name]
+            cost, capacity = cost or 0.0, capacity or 0.0
+            sources.append(u)
+            targets.append(v)
+            costs.append(cost)
+            capacities.append(capacity)
+            if symmetric and u != v:
+                sources.append(v)
+                targets.append(u)
+                costs.append(cost)
+                capacities.append(capacity)
+        self._rebuild_index()
+        duplicate = self._find_duplicate(set(sources[start:]))
+        if duplicate is not None:
+            for column in (sources, targets, costs, capacities):
+                del column[start:]
+            self._rebuild_index()
+            raise EdgeAlreadyExistsError(*(self._nodes[i].name for i in duplicate))
+
+    def _find_duplicate(self, indices: Iterable[int]) -> Optional[Tuple[int, int]]:
+        # Remembers the last node that had an edge to each target (cheaper than sorting the edges of every node):
+        targets, edge_positions, offsets = self.targets, self._edge_positions, self.offsets
+        last_source = array('q', [-1]) * len(self._nodes)
+        for u in indices:
+            for pos in edge_positions[offsets[u]:offsets[u + 1]]:
+                v = targets[pos]
+                if last_source[v] == u:
+                    return u, v
+                last_source[v] = u
+        return None
+
+    def remove_edge(self, from_node_name: Hashable, to_node_name: Hashable):
+        """Removes the edge (from_node_name, to_node_name) by turning it into a tombstone (see `flush`)."""
+        u, v = self._name_to_index[from_node_name], self.node_index(to_node_name)
+        pos = None if v is None else self._find(u, v)
+        if pos is None:
+            raise KeyError(f"There is no edge ({from_node_name}, {to_node_name})")
+        if self._added.get((u, v)) == pos:
+            del self._added[u, v]
+        self.sources[pos] = REMOVED
+        self._tombstones += 1
+        self._changed.add(u)
+
+    def remove_node(self, node_name: Hashable):
+        raise TypeError("CSR backends do not support removing nodes, that would renumber all later nodes.")
+
+    def node_names(self) -> Iterable[Hashable]:
+        return self._name_to_index.keys()
+
+    @property
+    def data(self) -> Any:
+        if self._tombstones:
+            self._rebuild_index()
+        return self.sources, self.targets, self.costs, self.capacities, self.balances
@@ -0,0 +1,60 @@
+from typing import Hashable
+
+from grapresso.backends.api import NodeAlreadyExistsError
+from grapresso.backends.memory import InMemoryBackend, Trait
+from grapresso.components.edge import Edge
+from grapresso.components.node import Node, IndexedNode
+
+
+class MemoryNode(Node):
+    """Node that edges can be removed from again."""
+
+    def disconnect(self, neighbour) -> Edge:
+        """Removes the first connected edge between this node and neighbour (a node or node name).
+
+        Raises:
+            KeyError: If there is no such edge.
+        """
+        for i, edge in enumerate(self._edges):
+            if edge.opposite(self) == neighbour:
+                return self._edges.pop(i)
+        raise KeyError(f"There is no neighbour '{neighbour}' accessible from node '{self}'!")
+
+
+class IndexedMemoryNode(MemoryNode, IndexedNode):
+    """`IndexedNode` that edges can be removed from again."""
+
+    def disconnect(self, neighbour) -> Edge:
+        edge = super().disconnect(neighbour)
+        # Like connect, index the last connected of the remaining parallel edges:
+        remaining = [e for e in self._edges if e.to_node == neighbour]
+        if remaining:
+            self._indexed_edges[edge.to_node] = remaining[-1]
+        else:
+            del self._indexed_edges[edge.to_node]
+        return edge
+
+
+class MemoryBackend(InMemoryBackend):
+    """`InMemoryBackend` that implements `remove_edge`.
+
+    Only the first of several parallel edges is removed.
+    Symmetric edges need to be removed in both directions (for `Trait.OPTIMIZE_MEMORY` both nodes share one edge).
+    """
+
+    def add_node(self, node_name, **attributes):
+        if node_name in self:
+            raise NodeAlreadyExistsError(node_name)
+        node_class = IndexedMemoryNode if self._dna is Trait.OPTIMIZE_PERFORMANCE else MemoryNode
+        self._id_to_node[node_name] = node_class(node_name, **attributes)
+
+    def remove_edge(self, from_node_name: Hashable, to_node_name: Hashable):
+        """Removes the (first) edge (from_node_name, to_node_name).
+
+        Raises:
+            KeyError: If there is no such edge.
+        """
+        try:
+            self[from_node_name].disconnect(to_node_name)
+        except KeyError:
+            raise KeyError(f"There is no edge ({from_node_name}, {to_node_name})") from None
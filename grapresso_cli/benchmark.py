@@ -0,0 +1,94 @@
+""" Repetition engine for timing methods: A drop-in replacement of grapresso's `timeit` that additionally supports
+warm-up runs, disabling the garbage collector during measurement and adaptive repetition until the confidence
+interval of the mean is tight enough (or a time budget is exhausted).
+"""
+
+import gc
+import math
+import statistics
+from time import perf_counter
+
+# Two-sided 95% quantiles of Student's t-distribution by degrees of freedom (normal approximation above 30):
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160, 2.145, 2.131,
+        2.120, 2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+Z_95 = 1.96
+
+DEFAULT_MAX_RUNS = 1000
+
+
+def summarize(runs) -> dict:
+    """Statistics of timing samples (in ms): avg, fastest, slowest, median, iqr, stdev and ci.
+    ci is the half-width of the 95% confidence interval of the mean relative to the mean.
+    """
+    mean = statistics.mean(runs)
+    stdev = statistics.stdev(runs) if len(runs) > 1 else 0.0
+    if len(runs) > 1:
+        quartiles = statistics.quantiles(runs, n=4)
+        iqr = quartiles[2] - quartiles[0]
+        t = T_95[len(runs) - 2] if len(runs) - 1 <= len(T_95) else Z_95
+        ci = t * stdev / math.sqrt(len(runs)) / mean if mean else 0.0
+    else:
+        iqr, ci = 0.0, math.inf
+    return {'avg': mean, 'fastest': min(runs), 'slowest': max(runs), 'median': statistics.median(runs),
+            'iqr': iqr, 'stdev': stdev, 'ci': ci}
+
+
+def benchmark(fn: callable, number: int = 1,
+              status_fn: callable = lambda n, t: print("\rRun #", n + 1, "took", t, "ms.", end="", flush=True),
+              cleanup_fn: callable = lambda r: print("", flush=True),
+              warmup: int = 0, disable_gc: bool = False,
+              target_ci: float = None, time_budget: float = None, max_runs: int = DEFAULT_MAX_RUNS):
+    """Runs fn at least number times and measures every run.
+
+    Args:
+        fn: Function to measure.
+        number: Number of (minimum) runs.
+        status_fn: Called after every measured run with the run index and the time in ms.
+        cleanup_fn: Called with the result dict at the end.
+        warmup: Number of unmeasured runs before the measurement (e.g. to fill caches).
+        disable_gc: Disable the garbage collector during each run (it is collected before each run instead).
+        target_ci: If given, continue running until the relative 95% confidence interval of the mean
+            is at most target_ci (e.g. 0.02 for ±2%), the time budget is exhausted or max_runs are reached.
+        time_budget: Time budget in seconds for the adaptive runs (only used with target_ci).
+        max_runs: Upper limit for the adaptive runs (only used with target_ci).
+
+    Returns:
+        Dict with the keys of `summarize`, the samples ('runs'), 'warmup' and the last 'return' value of fn.
+    """
+    gc_enabled = gc.isenabled()
+    result = None
+    for _ in range(warmup):
+        result = fn()
+
+    runs = []
+    started = perf_counter()
+    try:
+        while True:
+            if disable_gc:
+                gc.collect()
+                gc.disable()
+            start_time = perf_counter()
+            result = fn()
+            end_time = perf_counter()
+            if disable_gc and gc_enabled:
+                gc.enable()
+            runs.append(round((end_time - start_time) * 1000, 5))
+            if status_fn:
+                status_fn(len(runs) - 1, runs[-1])
+
+            if len(runs) < number:
+                continue
+            if target_ci is None or len(runs) >= max_runs:
+                break
+            if time_budget is not None and perf_counter() - started >= time_budget:
+                break
+            if len(runs) > 1 and summarize(runs)['ci'] <= target_ci:
+                break
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    result = {'return': result, **summarize(runs), 'runs': runs, 'warmup': warmup}
+    if cleanup_fn:
+        cleanup_fn(result)
+    return result
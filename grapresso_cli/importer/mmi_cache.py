@@ -0,0 +1,86 @@
+""" Compiled, binary on-disk cache of parsed MMI graphs.
+
+Layout (native byte order, all sections 8-byte aligned):
+- Header: magic, version, source mtime (ns) and size, node count, edge count and the `MetaInfo` fields
+- balances (double[node_count], only if balanced)
+- sources, targets (int64[edge_count])
+- costs (double[edge_count], only if weighted), capacities (double[edge_count], only if capacity)
+
+Loading memory-maps the file and casts the sections to typed views, so no text parsing is involved at all.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import Optional
+
+from grapresso_cli.importer.mmi_importer import MetaInfo, MmiData
+
+MAGIC = b'MMIB'
+VERSION = 1
+HEADER = struct.Struct('=4sH2xqqqqq4?4x')
+CACHE_DIR_NAME = 'serialized'
+CACHE_EXT = '.bin'
+
+
+def cache_path(source_path, cache_dir=None):
+    """Returns the cache file of source_path, by default in a `serialized` directory next to the source."""
+    source_dir, file_name = os.path.split(source_path)
+    return os.path.join(cache_dir or os.path.join(source_dir, CACHE_DIR_NAME), file_name + CACHE_EXT)
+
+
+def write(data: MmiData, path, source_stat: os.stat_result):
+    meta = data.meta_info
+    header = HEADER.pack(MAGIC, VERSION, source_stat.st_mtime_ns, source_stat.st_size,
+                         data.node_count, len(data.sources), meta.matching_group_no,
+                         meta.weighted, meta.capacity, meta.matching, meta.balanced)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so that concurrent readers never see a half-written cache:
+    tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+    with open(tmp_path, 'wb') as file:
+        file.write(header)
+        for section in (data.balances, data.sources, data.targets, data.costs, data.capacities):
+            file.write(section)
+    os.replace(tmp_path, path)
+
+
+def load(path, source_stat: os.stat_result) -> Optional[MmiData]:
+    """Memory-maps a cache file.
+
+    Returns:
+        The cached data or None if there is no (valid) cache for the source file's current mtime and size.
+    """
+    try:
+        file = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    with file:
+        if os.fstat(file.fileno()).st_size < HEADER.size:
+            return None
+        buffer = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    (magic, version, mtime_ns, size, node_count, edge_count, group_no,
+     weighted, capacity, matching, balanced) = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION or mtime_ns != source_stat.st_mtime_ns or size != source_stat.st_size:
+        return None
+    if len(buffer) != HEADER.size + 8 * (node_count * balanced + edge_count * (2 + weighted + capacity)):
+        return None
+
+    offset = HEADER.size
+
+    def section(fmt, count, present=True):
+        nonlocal offset
+        if not present:
+            return array(fmt)
+        end = offset + count * 8
+        view = buffer[offset:end].cast(fmt)
+        offset = end
+        return view
+
+    balances = section('d', node_count, balanced)
+    sources, targets = section('q', edge_count), section('q', edge_count)
+    costs, capacities = section('d', edge_count, weighted), section('d', edge_count, capacity)
+    return MmiData(MetaInfo(group_no, weighted, capacity, matching, balanced), node_count, balances,
+                   sources, targets, costs, capacities)
@@ -0,0 +1,96 @@
+""" Incremental updates of already imported graphs.
+
+A delta file lists edge changes, one per line (blank lines and lines starting with # are ignored):
+- `+ u v [cost [capacity]]` adds the edge (u, v), missing nodes are created
+- `- u v` removes the edge (u, v), of parallel edges only the first one
+- `~ u v cost [capacity]` changes the cost (and capacity) of the edge (u, v)
+
+Node names are integers, like in MMI files. For undirected graphs, every change applies to (v, u) as well.
+"""
+
+from typing import NamedTuple, List, Optional
+
+from grapresso.components.graph import UnDiGraph
+
+OPERATIONS = ('+', '-', '~')
+
+DeltaOp = NamedTuple('DeltaOp', [('op', str), ('u', int), ('v', int),
+                                 ('cost', Optional[float]), ('capacity', Optional[float])])
+
+# Number of applied changes per operation and the graph's content hash afterwards (if a result cache was given):
+AppliedDelta = NamedTuple('AppliedDelta', [('added', int), ('removed', int), ('reweighted', int),
+                                           ('content_hash', Optional[str])])
+
+
+def parse_delta(content: bytes, file_path) -> List[DeltaOp]:
+    """Parses the content of a delta file, file_path is only used in error messages."""
+    ops = []
+    for line_no, line in enumerate(content.splitlines(), 1):
+        tokens = line.split()
+        if not tokens or tokens[0].startswith(b'#'):
+            continue
+        op = tokens[0].decode('ascii', 'replace')
+        max_columns = 3 if op == '-' else 5
+        min_columns = 4 if op == '~' else 3
+        try:
+            if op not in OPERATIONS or not min_columns <= len(tokens) <= max_columns:
+                raise ValueError()
+            values = [float(token) for token in tokens[3:]] + [None] * (5 - len(tokens))
+            ops.append(DeltaOp(op, int(tokens[1]), int(tokens[2]), *values))
+        except ValueError:
+            raise ValueError("Malformed delta in '{}', line {}: {!r}".format(
+                file_path, line_no, line.decode('ascii', 'replace'))) from None
+    return ops
+
+
+def remove_edge(graph, u, v):
+    """Removes the edge (u, v) from graph, and (v, u) as well if the graph is undirected.
+    Of several parallel edges, only the first one is removed (the backend has to implement `remove_edge`).
+
+    Raises:
+        KeyError: If there is no such edge.
+    """
+    if graph.edge(u, v) is None:
+        raise KeyError("There is no edge ({}, {})".format(u, v))
+    backend = graph.backend
+    backend.remove_edge(u, v)
+    if isinstance(graph, UnDiGraph) and u != v:
+        backend.remove_edge(v, u)
+
+
+def reweight_edge(graph, u, v, cost, capacity=None):
+    """Sets the cost (and capacity, if given) of the edge (u, v), and of (v, u) as well if the graph is undirected.
+
+    Raises:
+        KeyError: If there is no such edge.
+    """
+    edges = [graph.edge(u, v)]
+    if isinstance(graph, UnDiGraph):
+        # Depending on the backend, one of the two might only be a copy of the stored edge, so set both:
+        edges.append(graph.edge(v, u))
+    if edges[0] is None:
+        raise KeyError("There is no edge ({}, {})".format(u, v))
+    for edge in edges:
+        edge.cost = cost
+        if capacity is not None:
+            edge.capacity = capacity
+
+
+def apply_delta(graph, ops: List[DeltaOp]) -> AppliedDelta:
+    """Applies the parsed changes in order to graph (in place)."""
+    counts = dict.fromkeys(OPERATIONS, 0)
+    for op, u, v, cost, capacity in ops:
+        if op == '+':
+            for node_name in (u, v):
+                if node_name not in graph.backend:
+                    graph.add_node(node_name, balance=0.0)  # Some backends require the balance to be set
+            graph.add_edge(u, v, cost=cost or 0.0, capacity=capacity or 0.0)
+        elif op == '-':
+            remove_edge(graph, u, v)
+        else:
+            reweight_edge(graph, u, v, cost, capacity)
+        counts[op] += 1
+    flush = getattr(graph.backend, 'flush', None)
+    if flush is not None:
+        flush()  # Backends that batch changes (CSR) update their index once per delta
+    return AppliedDelta(counts['+'], counts['-'], counts['~'], None)
@@ -1,30 +1,270 @@
+import concurrent.futures
+import gc
 import os
-from typing import NamedTuple
+import threading
+from array import array
+from contextlib import contextmanager
+from itertools import repeat
+from typing import NamedTuple, Iterator, Iterable, Tuple, Callable, AsyncIterator, TYPE_CHECKING
 
-from grapresso.backends.api import DataBackend
-from grapresso.components.graph import UnDiGraph, DiGraph
+# grapresso (which imports NetworkX), asyncio and the process pool are only imported once they are needed,
+# so that e.g. the CLI's stream backend can parse files without paying for these imports:
+if TYPE_CHECKING:
+    from grapresso.backends.api import DataBackend
+    from grapresso.components.graph import DiGraph
+    from grapresso_cli import result_cache
+    from grapresso_cli.importer import mmi_delta
 
 MetaInfo = NamedTuple('MetaInfo', [('matching_group_no', int),
                                    ('weighted', bool), ('capacity', bool), ('matching', bool), ('balanced', bool)])
 
+# Parsed (but not yet built) MMI graph. Edges are stored column-wise in typed arrays:
+MmiData = NamedTuple('MmiData', [('meta_info', MetaInfo), ('node_count', int), ('balances', array),
+                                 ('sources', array), ('targets', array), ('costs', array), ('capacities', array)])
+
+# Graph returned together with the meta info of its file (instead of storing the latter in the importer):
+ImportedGraph = NamedTuple('ImportedGraph', [('graph', 'DiGraph'), ('meta_info', MetaInfo)])
+
+READ_CHUNK_SIZE = 1024 ** 2
+MMI_EXTENSIONS = ('mmi', 'mmiw', 'mmic', 'mmiwc', 'mmim', 'mmibwc')
+
+
+def file_format(file_path) -> MetaInfo:
+    """Derives the MMI format flags from the file extension (the group number is only known after reading)."""
+    return MetaInfo(0,
+                    weighted=file_path.endswith('w') or file_path.endswith('wc'),
+                    capacity=file_path.endswith('c') or file_path.endswith('wc'),
+                    matching=file_path.endswith('m'),
+                    balanced=file_path.endswith('bwc'))
+
+
+def parse_bytes(content: bytes, file_path) -> MmiData:
+    """Parses the content of a MMI file, file_path is only needed to determine the format (by its extension)."""
+    fmt = file_format(file_path)
+    tokens = content.split()
+
+    node_count = int(tokens[0])
+    pos = 1
+    group_no = 0
+    if fmt.matching:
+        group_no = int(tokens[pos])
+        pos += 1
+    balances = array('d')
+    if fmt.balanced:
+        balances = array('d', map(float, tokens[pos:pos + node_count]))
+        pos += node_count
+
+    columns = 2 + fmt.weighted + fmt.capacity
+    edge_tokens = tokens[pos:]
+    if len(edge_tokens) % columns:
+        raise ValueError("Malformed edge block in '{}': expected {} columns per edge.".format(file_path, columns))
+    return MmiData(fmt._replace(matching_group_no=group_no), node_count, balances,
+                   sources=array('q', map(int, edge_tokens[0::columns])),
+                   targets=array('q', map(int, edge_tokens[1::columns])),
+                   costs=array('d', map(float, edge_tokens[2::columns])) if fmt.weighted else array('d'),
+                   capacities=array('d', map(float, edge_tokens[columns - 1::columns])) if fmt.capacity
+                   else array('d'))
+
+
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+@contextmanager
+def _paused_gc():
+    """Pauses the cyclic garbage collector, re-entrant and thread-safe: It is enabled again (if it was enabled
+    before) once the last concurrent pause ends.
+    """
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
+
+
+def build_graph(backend: 'DataBackend', data: MmiData, is_directed=False):
+    """Builds a graph from already parsed MMI data by handing all nodes and edges to the backend in one pass.
+
+    Backends that offer a native bulk API (NetworkX, CSR) receive the whole batch of edges at once,
+    all other backends are fed directly via their `DataBackend` API (skipping the graph's per-call node checks).
+    The cyclic garbage collector is paused meanwhile, since building a graph only allocates objects that stay alive.
+    """
+    costs = data.costs if data.meta_info.weighted else repeat(0.0)
+    capacities = data.capacities if data.meta_info.capacity else repeat(0.0)
+    balances = data.balances if data.meta_info.balanced else repeat(0.0, data.node_count)
+    return build_graph_from_edges(backend, balances, zip(data.sources, data.targets, costs, capacities), is_directed)
+
+
+def build_graph_from_edges(backend: 'DataBackend', balances: Iterable[float],
+                           edges: Iterable[Tuple[int, int, float, float]], is_directed=False):
+    """Like `build_graph`, but the nodes 0..n-1 (given by their balances) and the (from_node, to_node, cost, capacity)
+    edges can be streamed from anywhere, e.g. a graph generator.
+    """
+    from grapresso.components.graph import UnDiGraph, DiGraph
+
+    graph = DiGraph(backend) if is_directed else UnDiGraph(backend)
+    symmetric = not is_directed
+    with _paused_gc():
+        nx_graph = getattr(backend, 'nx_graph', None)
+        if nx_graph is not None:
+            nx_graph.add_nodes_from((i, {'balance': b}) for i, b in enumerate(balances))
+            nx_graph.add_edges_from(_nx_edges(edges, symmetric))
+        elif hasattr(backend, 'add_edges_from'):
+            add_node = backend.add_node
+            for i, balance in enumerate(balances):
+                add_node(i, balance=balance)
+            backend.add_edges_from(edges, symmetric)
+        else:
+            add_node, add_edge = backend.add_node, backend.add_edge
+            for i, balance in enumerate(balances):
+                add_node(i, balance=balance)
+            for u, v, cost, capacity in edges:
+                add_edge(u, v, symmetric, cost=cost, capacity=capacity)
+    return graph
+
+
+def _nx_edges(edges, symmetric):
+    # Keep the insertion order of the per-call API, i.e. (u, v) directly followed by (v, u):
+    for u, v, cost, capacity in edges:
+        yield u, v, {'cost': cost, 'capacity': capacity}
+        if symmetric:
+            yield v, u, {'cost': cost, 'capacity': capacity}
+
+
+def _read_file(file_path) -> bytes:
+    with open(file_path, 'rb', buffering=READ_CHUNK_SIZE) as file:
+        return file.read()
+
 
 class MmiImporter:
-    def __init__(self, relative_dir=None):
+    def __init__(self, relative_dir=None, use_cache=False, cache_dir=None):
+        """
+        Args:
+            relative_dir: Directory that file paths are relative to.
+            use_cache: Load graphs from (and store them in) a compiled binary cache, see `mmi_cache`.
+            cache_dir: Cache directory, defaults to a `serialized` directory next to each source file.
+        """
         self._relative_dir = relative_dir
+        self._use_cache = use_cache
+        self._cache_dir = cache_dir
         self._meta_info = None
 
-    def read_graph(self, backend: DataBackend, file_path, is_directed=False):
-        if self._relative_dir:
-            file_path = os.path.join(self._relative_dir, file_path)
+    def _path(self, file_path):
+        return os.path.join(self._relative_dir, file_path) if self._relative_dir else file_path
+
+    def parse(self, file_path) -> MmiData:
+        """Parses a MMI file in bulk: The file is read in large chunks and split as a whole,
+        the edge block is then sliced column-wise into typed arrays.
+        If caching is enabled, a valid cache entry is used instead and the text is not parsed at all.
+
+        Args:
+            file_path: Path of the MMI file (relative to the importer's directory if specified).
+
+        Returns:
+            Parsed data that can be turned into a graph using `build_graph`.
+        """
+        file_path = self._path(file_path)
+        if not self._use_cache:
+            return self._parse_text(file_path)
+
+        from grapresso_cli.importer import mmi_cache  # Not at module level since mmi_cache depends on this module
+        source_stat = os.stat(file_path)
+        path = mmi_cache.cache_path(file_path, self._cache_dir)
+        data = mmi_cache.load(path, source_stat)
+        if data is None:
+            data = self._parse_text(file_path)
+            mmi_cache.write(data, path, source_stat)
+        return data
+
+    @staticmethod
+    def _parse_text(file_path) -> MmiData:
+        return parse_bytes(_read_file(file_path), file_path)
+
+    def import_graph(self, backend: 'DataBackend', file_path, is_directed=False) -> ImportedGraph:
+        """Imports a MMI file into backend. Unlike `read_graph`, this does not modify the importer's state,
+        so one importer can be shared by threads or async tasks.
+
+        Returns:
+            The graph and the meta info of its file.
+        """
+        data = self.parse(file_path)
+        return ImportedGraph(build_graph(backend, data, is_directed), data.meta_info)
 
-        weighted = file_path.endswith('w') or file_path.endswith('wc')
-        capacity = file_path.endswith('c') or file_path.endswith('wc')
-        matching = file_path.endswith('m')
-        balanced = file_path.endswith('bwc')
+    def import_graphs(self, create_backend: Callable[[], 'DataBackend'], file_paths, is_directed=False,
+                      max_workers=None) -> Iterator[ImportedGraph]:
+        """Imports several MMI files concurrently in a thread pool (see `import_graph`).
+        Threads mostly help with I/O bound imports (e.g. from the compiled cache), use `import_dir` to also parse
+        in parallel.
+
+        Args:
+            create_backend: Creates an empty backend for every graph.
+            file_paths: Paths of the MMI files.
+            is_directed: Whether to build directed graphs.
+            max_workers: Number of threads.
+
+        Yields:
+            The imported graphs in the order of file_paths.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            yield from executor.map(lambda file_path: self.import_graph(create_backend(), file_path, is_directed),
+                                    file_paths)
+
+    def apply_delta(self, graph, file_path, cache: 'result_cache.ResultCache' = None,
+                    content_hash=None) -> 'mmi_delta.AppliedDelta':
+        """Applies the edge changes of a delta file (see `mmi_delta`) to an already imported graph in place,
+        instead of re-importing the whole graph.
+
+        Args:
+            graph: Graph to modify.
+            file_path: Path of the delta file (relative to the importer's directory if specified).
+            cache: Result cache whose results of the graph are invalidated.
+            content_hash: Content hash of the graph before the change (computed if omitted and a cache is given).
+
+        Returns:
+            The number of applied changes and, if a cache is given, the graph's new content hash.
+        """
+        from grapresso_cli import result_cache
+        from grapresso_cli.importer import mmi_delta
+
+        file_path = self._path(file_path)
+        ops = mmi_delta.parse_delta(_read_file(file_path), file_path)
+        if cache is not None and content_hash is None:
+            content_hash = result_cache.graph_hash(graph)
+        applied = mmi_delta.apply_delta(graph, ops)
+        if cache is None:
+            return applied
+        cache.invalidate(content_hash)
+        return applied._replace(content_hash=result_cache.graph_hash(graph))
+
+    def read_graph(self, backend: 'DataBackend', file_path, is_directed=False):
+        graph, self._meta_info = self.import_graph(backend, file_path, is_directed)
+        return graph
+
+    def read_graph_by_line(self, backend: 'DataBackend', file_path, is_directed=False):
+        graph, self._meta_info = self.import_graph_by_line(backend, file_path, is_directed)
+        return graph
+
+    def import_graph_by_line(self, backend: 'DataBackend', file_path, is_directed=False) -> ImportedGraph:
+        """Line-by-line fallback of `import_graph` that only uses the graph's per-call API."""
+        from grapresso.components.graph import UnDiGraph, DiGraph
+
+        file_path = self._path(file_path)
+        fmt = file_format(file_path)
+        weighted, capacity, matching, balanced = fmt.weighted, fmt.capacity, fmt.matching, fmt.balanced
+        capacity_column = 2 + weighted
 
         last_import_group_no = 0
         graph = DiGraph(backend) if is_directed else UnDiGraph(backend)
-        with open(file_path, 'rt', buffering=1, encoding='ascii') as file:
+        with open(file_path, 'rt', encoding='ascii') as file:
             node_count = int(file.readline().strip())
             if matching:
                 last_import_group_no = int(file.readline().strip())
@@ -32,17 +272,132 @@ class MmiImporter:
                 graph.add_node(i, balance=float(file.readline().strip()) if balanced else 0.0)
 
             for line in file:
-                edge = line.strip().split()
+                edge = line.split()
                 graph.add_edge(int(edge[0]), int(edge[1]),
                                cost=float(edge[2]) if weighted else 0.0,
-                               capacity=float(edge[2 + file_path.endswith('wc')]) if capacity else 0.0)
-        self._meta_info = MetaInfo(last_import_group_no, weighted, capacity, matching, balanced)
-        return graph
+                               capacity=float(edge[capacity_column]) if capacity else 0.0)
+        return ImportedGraph(graph, fmt._replace(matching_group_no=last_import_group_no))
+
+    def _open_stream(self, file_path):
+        file_path = self._path(file_path)
+        fmt = file_format(file_path)
+        file = open(file_path, 'rb', buffering=READ_CHUNK_SIZE)
+        try:
+            node_count = int(file.readline())
+            group_no = int(file.readline()) if fmt.matching else 0
+        except ValueError:
+            file.close()
+            raise
+        return file, node_count, fmt._replace(matching_group_no=group_no)
+
+    def read_header(self, file_path) -> Tuple[int, MetaInfo]:
+        """Reads only the header of a MMI file.
+
+        Returns:
+            Node count and meta info.
+        """
+        file, node_count, meta_info = self._open_stream(file_path)
+        file.close()
+        return node_count, meta_info
+
+    def iter_nodes(self, file_path) -> Iterator[Tuple[int, float]]:
+        """Lazily yields all nodes as (node, balance) with constant memory."""
+        file, node_count, meta_info = self._open_stream(file_path)
+        with file:
+            for i in range(node_count):
+                yield i, float(file.readline()) if meta_info.balanced else 0.0
+
+    def iter_edges(self, file_path) -> Iterator[Tuple[int, int, float, float]]:
+        """Lazily yields all edges as (from_node, to_node, cost, capacity) with constant memory.
+        Unlike `read_graph`, no graph is built, so this also works for edge lists that do not fit into memory.
+        """
+        file, node_count, meta_info = self._open_stream(file_path)
+        weighted, capacity = meta_info.weighted, meta_info.capacity
+        capacity_column = 2 + weighted
+        with file:
+            if meta_info.balanced:
+                for _ in range(node_count):
+                    file.readline()
+            for line in file:
+                edge = line.split()
+                if edge:
+                    yield (int(edge[0]), int(edge[1]),
+                           float(edge[2]) if weighted else 0.0,
+                           float(edge[capacity_column]) if capacity else 0.0)
+
+    def scan_dir(self, directory='', ext=MMI_EXTENSIONS):
+        """Lists the names of all files in directory (relative to the importer's directory) with one of ext."""
+        suffixes = tuple('.' + e for e in ext)
+        return [fn for fn in os.listdir(self._path(directory) or os.curdir) if fn.endswith(suffixes)]
+
+    def import_dir(self, create_backend: Callable[[], 'DataBackend'], directory='', is_directed=False,
+                   ext=MMI_EXTENSIONS, max_workers=None) -> Iterator[Tuple[str, 'DiGraph', MetaInfo]]:
+        """Imports all MMI files of a directory concurrently, see `import_dir_async`.
+
+        Yields:
+            (file name, graph, meta info) in order of completion.
+        """
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        graphs = self.import_dir_async(create_backend, directory, is_directed, ext, max_workers)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(graphs.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(graphs.aclose())
+            loop.close()
+
+    async def import_dir_async(self, create_backend: Callable[[], 'DataBackend'], directory='', is_directed=False,
+                               ext=MMI_EXTENSIONS, max_workers=None) -> AsyncIterator[Tuple[str, 'DiGraph', MetaInfo]]:
+        """Imports all MMI files of a directory concurrently:
+        Files are read by asyncio (in threads) and parsed in a process pool, so disk I/O overlaps with parsing.
+        The largest files start first. Graphs are built (by this process) as soon as their file is parsed.
+
+        Args:
+            create_backend: Creates an empty backend for every graph.
+            directory: Directory relative to the importer's directory.
+            is_directed: Whether to build directed graphs.
+            ext: Extensions of the files to import.
+            max_workers: Number of parsing processes (defaults to the number of CPUs).
+
+        Yields:
+            (file name, graph, meta info) in order of completion.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        paths = {fn: self._path(os.path.join(directory, fn)) for fn in self.scan_dir(directory, ext)}
+        names = sorted(paths, key=lambda fn: os.path.getsize(paths[fn]), reverse=True)
+        max_workers = max_workers or os.cpu_count() or 1
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers)
+        # Bound the files in flight, so that a huge directory is not read into memory all at once:
+        in_flight = asyncio.Semaphore(2 * max_workers)
+
+        async def load(name):
+            async with in_flight:
+                if self._use_cache:  # Loading a compiled cache entry is I/O bound, no need to parse
+                    return name, await loop.run_in_executor(None, self.parse, os.path.join(directory, name))
+                content = await loop.run_in_executor(None, _read_file, paths[name])
+                return name, await loop.run_in_executor(executor, parse_bytes, content, paths[name])
 
-    def scan_dir(self, directory='', ext=('mmi', 'mmiw', 'mmic', 'mmiwc')):
-        return [fn for fn in os.listdir(os.path.join(self._relative_dir, directory))
-                if (fn.endswith(e) for e in ext)]  # Only allow files ending with ext
+        tasks = [asyncio.ensure_future(load(name)) for name in names]
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                name, data = await next_completed
+                yield name, build_graph(create_backend(), data, is_directed), data.meta_info
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            executor.shutdown(cancel_futures=True)
 
     @property
     def last_import_metainfo(self) -> MetaInfo:
+        """Meta info of the last `read_graph` call (kept for backwards compatibility).
+        This state is shared by all callers, so prefer the meta info returned by `import_graph`.
+        """
         return self._meta_info
@@ -0,0 +1,79 @@
+""" Out-of-core fallback for graphs that would not fit into memory (see mmi_cli.py --memory-limit).
+
+The graph is imported into a snapshot with the CSR layout of `shared_graph`, but in a memory-mapped temporary file:
+The operating system pages the edge columns in and out as needed, only the node views stay on the Python heap.
+The MMI file is streamed twice (counting the CSR entries per node, then placing them), so its edges are never held
+in memory at once either.
+"""
+
+import mmap
+import tempfile
+from array import array
+
+from grapresso_cli.importer.mmi_importer import MmiImporter
+from grapresso_cli.shared_graph import HEADER, BufferCsrView, snapshot_size
+
+
+class MappedCsrView(BufferCsrView):
+    """CSR view over a memory-mapped file."""
+
+    def __init__(self, file, mapping: mmap.mmap):
+        self._file = file
+        self._mapping = mapping
+        super().__init__(mapping)
+
+    def close(self):
+        """Unmaps the file, temporary files are deleted thereby."""
+        self._release_views()
+        self._mapping.close()
+        self._file.close()
+
+
+def map_mmi_file(importer: MmiImporter, file_path, is_directed=False, directory=None):
+    """Imports a MMI file into a new memory-mapped snapshot.
+    The edges of every node keep the order of the file (like when importing them into a graph).
+
+    Args:
+        importer: Importer that file_path is read by.
+        file_path: Path of the MMI file.
+        is_directed: Whether the graph is directed.
+        directory: Directory of the temporary file, defaults to the system's temporary directory.
+
+    Returns:
+        A read-only view of the graph, close its backend when done (this deletes the temporary file).
+    """
+    node_count, _ = importer.read_header(file_path)
+    offsets = array('q', [0]) * (node_count + 1)
+    for u, v, _, _ in importer.iter_edges(file_path):
+        offsets[u + 1] += 1
+        if not is_directed:
+            offsets[v + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+    entry_count = offsets[node_count]
+
+    file = tempfile.TemporaryFile(dir=directory)
+    try:
+        size = snapshot_size(node_count, entry_count)
+        file.truncate(size)
+        mapping = mmap.mmap(file.fileno(), size)
+    except BaseException:
+        file.close()
+        raise
+    HEADER.pack_into(mapping, 0, node_count, entry_count, is_directed)
+    backend = MappedCsrView(file, mapping)
+    try:
+        backend.offsets[:] = offsets
+        targets, costs, capacities, balances = backend.targets, backend.costs, backend.capacities, backend.balances
+        for i, balance in importer.iter_nodes(file_path):
+            balances[i] = balance
+        positions = offsets
+        for u, v, cost, capacity in importer.iter_edges(file_path):
+            for a, b in ((u, v),) if is_directed else ((u, v), (v, u)):
+                pos = positions[a]
+                targets[pos], costs[pos], capacities[pos] = b, cost, capacity
+                positions[a] = pos + 1
+    except BaseException:
+        backend.close()
+        raise
+    return backend.graph()
@@ -6,107 +6,562 @@ Example arguments:
 WIll
 """
 
+from time import perf_counter
+
+_imports_started = perf_counter()
+
 import argparse
+import contextlib
+import io
 import os
 import sys
+import threading
+import concurrent.futures
 
 LIB_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..")
 sys.path.insert(1, LIB_DIR)
 
-from grapresso.tools.memory import getsize
-from grapresso.tools.performance import timeit
-from grapresso.backends.memory import InMemoryBackend, Trait
-from grapresso.backends.networkx import NetworkXBackend
-from grapresso.components.graph import UnDiGraph, DiGraph
-from grapresso_cli.importer.mmi_importer import MmiImporter
-
-BACKEND_DISPATCH = {'mem-optper': lambda: InMemoryBackend(Trait.OPTIMIZE_PERFORMANCE),
-                    'mem-optmem': lambda: InMemoryBackend(Trait.OPTIMIZE_PERFORMANCE),
-                    'mem': lambda: InMemoryBackend(),
-                    'nx ': NetworkXBackend()}
-
-METHOD_DISPATCH = {'count-components': UnDiGraph.count_connected_components,
-                   'kruskal': UnDiGraph.perform_kruskal,
-                   'prim': UnDiGraph.perform_prim,
-                   'nearest-neighbour': UnDiGraph.perform_nearest_neighbour_tour,
-                   'enumerate': UnDiGraph.enumerate,
-                   'enumerate-bb': UnDiGraph.enumerate_bnb,
-                   'double-tree': UnDiGraph.double_tree_tour,
-                   'dijkstra': UnDiGraph.perform_dijkstra,
-                   'mbf': UnDiGraph.perform_bellman_ford}
+from grapresso_cli import footprint, profiling, registry, report
+from grapresso_cli.benchmark import benchmark, DEFAULT_MAX_RUNS
+from grapresso_cli.importer.mmi_importer import MmiImporter, build_graph
+
+# Heavy modules (grapresso imports NetworkX) are only imported once a run needs them:
+result_cache = registry.LazyModule('grapresso_cli.result_cache')
+shared_graph = registry.LazyModule('grapresso_cli.shared_graph')
+multi_source = registry.LazyModule('grapresso_cli.multi_source')
+mapped_graph = registry.LazyModule('grapresso_cli.mapped_graph')
+
+registry.trace_import(__name__ + " (module-level imports)", perf_counter() - _imports_started)
+
+
+def _in_memory_backend(trait=None, mutable=False):
+    memory = registry.import_module('grapresso.backends.memory')
+    # Applying deltas needs to remove edges, which only grapresso_cli's MemoryBackend supports:
+    backend_class = registry.import_object('grapresso_cli.backends.memory:MemoryBackend') if mutable \
+        else memory.InMemoryBackend
+    return backend_class(memory.Trait[trait]) if trait else backend_class()
+
+
+BACKEND_DISPATCH = {'mem-optper': lambda: _in_memory_backend('OPTIMIZE_PERFORMANCE'),
+                    'mem-optmem': lambda: _in_memory_backend('OPTIMIZE_MEMORY'),
+                    'mem': lambda: _in_memory_backend(),
+                    'csr': lambda: registry.import_object('grapresso_cli.backends.csr:CsrBackend')(),
+                    'nx': lambda: registry.import_object('grapresso.backends.networkx:NetworkXBackend')()}
+
+# Backends for graphs that deltas are applied to, where they differ:
+MUTABLE_BACKEND_DISPATCH = {'mem-optper': lambda: _in_memory_backend('OPTIMIZE_PERFORMANCE', mutable=True),
+                            'mem-optmem': lambda: _in_memory_backend('OPTIMIZE_MEMORY', mutable=True),
+                            'mem': lambda: _in_memory_backend(mutable=True)}
+
+METHOD_DISPATCH = registry.LazyRegistry({
+    'count-components': 'grapresso.components.graph:UnDiGraph.count_connected_components',
+    'kruskal': 'grapresso.components.graph:UnDiGraph.perform_kruskal',
+    'prim': 'grapresso.components.graph:UnDiGraph.perform_prim',
+    'nearest-neighbour': 'grapresso.components.graph:UnDiGraph.perform_nearest_neighbour_tour',
+    'enumerate': 'grapresso.components.graph:UnDiGraph.enumerate',
+    'enumerate-bb': 'grapresso.components.graph:UnDiGraph.enumerate_bnb',
+    'double-tree': 'grapresso.components.graph:UnDiGraph.double_tree_tour',
+    'dijkstra': 'grapresso.components.graph:UnDiGraph.perform_dijkstra',
+    'mbf': 'grapresso.components.graph:UnDiGraph.perform_bellman_ford'})
+
+# Methods that take a start node as first argument (see --start):
+START_METHODS = {'prim', 'nearest-neighbour', 'enumerate', 'enumerate-bb', 'double-tree', 'dijkstra', 'mbf'}
+
+# Methods that are run as a batch over many sources with --sources (see multi_source.METHODS):
+MULTI_SOURCE_METHODS = ('dijkstra', 'mbf')
+
+# The stream "backend" does not build a graph at all, its methods consume the file's edges lazily:
+STREAM_BACKEND = 'stream'
+STREAM_METHOD_DISPATCH = registry.LazyRegistry({
+    'count-components': 'grapresso_cli.streaming:count_connected_components',
+    'kruskal': 'grapresso_cli.streaming:perform_kruskal'})
+
+# The shm "backend" imports into a read-only CSR snapshot in shared memory, with --jobs its methods run in parallel:
+SHARED_BACKEND = 'shm'
+
+# Graphs that exceed the --memory-limit can be imported into a memory-mapped file instead of their backend:
+MAPPED_STORAGE = 'mmap'
+OVER_LIMIT_ACTIONS = ('refuse', MAPPED_STORAGE)
+GRAPH_SIZE_MODES = ('estimate', 'exact')
 
 parser = argparse.ArgumentParser(description='Process MMI graph.')
 parser.add_argument('files', metavar='file', type=str, nargs='+',
                     help='MMI files to process.')
 parser.add_argument('--symmetric', action='store_const', const=True, default=False)
-parser.add_argument('--backends', nargs='+', choices=BACKEND_DISPATCH.keys(), default='mmi',
-                    help="Backend for storing the graph's data structure.")
+parser.add_argument('--backends', nargs='+', choices=list(BACKEND_DISPATCH.keys()) + [STREAM_BACKEND, SHARED_BACKEND],
+                    default='mmi',
+                    help="Backend for storing the graph's data structure. "
+                         "'{}' streams the edges from disk instead (only supports: {}). "
+                         "'{}' shares one read-only snapshot between all workers, which then perform the methods "
+                         "in parallel.".format(STREAM_BACKEND, ", ".join(STREAM_METHOD_DISPATCH), SHARED_BACKEND))
 parser.add_argument('--base-dir', type=str,
                     default=os.path.abspath(os.path.join(os.path.dirname(__file__), "./res/example-graphs/")))
 parser.add_argument('--methods', type=str, nargs='+',
                     help="Methods to execute (you can even say that you want to execute a method n-times:\n"
                          "\t Simply pass <n>*<method>, e.g. 3*count-components. "
                          "If the value before * is omitted, it will simply execute it once ('1*').")
-parser.add_argument('--graph-size', action='store_const', const=True, default=False)
+parser.add_argument('--start', type=int, default=None,
+                    help="Start node of the methods that take one ({}), by default they choose it themselves.".format(
+                        ", ".join(sorted(START_METHODS))))
+parser.add_argument('--sources', type=str, nargs='+', default=None, metavar='SOURCE',
+                    help="Run {} as a batch from many sources (nodes, ranges <from>:<to> with an exclusive end, "
+                         "or 'all') over one shared adjacency snapshot. The result is the distance row (to the nodes "
+                         "0..n-1) of every source. Large tables are not put into the result cache (see --distances)."
+                         .format(" and ".join(MULTI_SOURCE_METHODS)))
+parser.add_argument('--source-jobs', type=int, default=1,
+                    help="Number of worker processes that the --sources are spread across.")
+parser.add_argument('--distances', nargs=2, metavar=('{bin,csv}', 'DIR'), default=None,
+                    help="Stream the distance rows of --sources to a file per (file, backend, method) in DIR "
+                         "instead of keeping them in memory, e.g. 'K_10.mmiw.mem.dijkstra.bin'.")
+parser.add_argument('--graph-size', nargs='?', choices=GRAPH_SIZE_MODES, const='estimate', default=None,
+                    help="Report the size of each imported graph: 'estimate' (default) is based on the graph's node "
+                         "and edge count, 'exact' measures the graph recursively (slow for large graphs).")
+parser.add_argument('--memory-limit', type=float, default=None, metavar='MB',
+                    help="Estimate the memory needed to import each graph from its file's header and size before "
+                         "importing it, and handle graphs that exceed this limit according to --over-limit. "
+                         "With --jobs, the limit is divided between the processes that import graphs concurrently.")
+parser.add_argument('--over-limit', choices=OVER_LIMIT_ACTIONS, default='refuse',
+                    help="'refuse' skips graphs that exceed the --memory-limit, '{}' imports them into a read-only, "
+                         "memory-mapped file instead (not for the '{}' backend).".format(
+                             MAPPED_STORAGE, SHARED_BACKEND))
+parser.add_argument('--spill-dir', type=str, default=None,
+                    help="Directory of the memory-mapped files (default: the system's temporary directory).")
+parser.add_argument('--cache', action='store_const', const=True, default=False,
+                    help="Load graphs from a compiled binary cache (created on first import in a 'serialized' "
+                         "directory next to each file, invalidated when the file's mtime or size changes).")
+parser.add_argument('--jobs', type=int, default=1,
+                    help="Number of worker processes that run the independent (file, backend) cells in parallel. "
+                         "Each worker imports its own graph and is pinned to its own CPU core (at most one per core).")
+parser.add_argument('--warmup', type=int, default=0,
+                    help="Number of unmeasured warm-up runs before measuring a method.")
+parser.add_argument('--no-gc', action='store_const', const=True, default=False,
+                    help="Disable the garbage collector while a run is measured.")
+parser.add_argument('--target-ci', type=float, default=None,
+                    help="Adaptive mode: Repeat a method (at least n times) until the 95%% confidence interval "
+                         "of the mean is within ± the given fraction of the mean, e.g. 0.02.")
+parser.add_argument('--time-budget', type=float, default=None,
+                    help="Adaptive mode: Maximum seconds to spend on repeating a single method (requires --target-ci).")
+parser.add_argument('--max-runs', type=int, default=None,
+                    help="Adaptive mode: Maximum number of runs of a single method (requires --target-ci, "
+                         "default: {}).".format(DEFAULT_MAX_RUNS))
+parser.add_argument('--report', nargs=2, metavar=('{json,csv}', 'PATH'), default=None,
+                    help="Write all timing samples, peak memory (of an extra, untimed run of each method), graph size "
+                         "and environment info to a report file.")
+parser.add_argument('--compare', type=str, metavar='BASELINE', default=None,
+                    help="Compare against a baseline report and exit with a non-zero code if a method regressed.")
+parser.add_argument('--compare-threshold', type=float, default=0.1,
+                    help="Relative slowdown of the average time that is tolerated by --compare (default: 0.1).")
+parser.add_argument('--cache-dir', type=str, default=None,
+                    help="Alternative directory for the compiled graph cache.")
+parser.add_argument('--results-only', action='store_const', const=True, default=False,
+                    help="Do not time the methods, only determine their results. Results are looked up in the result "
+                         "cache (keyed by the graph's content hash, method and arguments) and computed on a miss.")
+parser.add_argument('--result-cache-dir', type=str, default=None,
+                    help="Persist the result cache in this directory. Timing runs never read from it, "
+                         "but store their results for later lookups.")
+parser.add_argument('--result-cache-size', type=float, default=256,
+                    help="Size limit of the on-disk result cache in MB (least recently used results are evicted).")
+parser.add_argument('--profile', choices=profiling.PROFILERS, default=None,
+                    help="Profile the import and every method (in an extra, untimed run after its timed runs): "
+                         "'cprofile' writes a .pstats file, 'sample' a collapsed-stack file (for flame graphs) per "
+                         "(file, backend, method).")
+parser.add_argument('--profile-dir', type=str, default='profiles',
+                    help="Directory for the profiles (default: ./profiles).")
+parser.add_argument('--profile-top-n', type=int, default=5,
+                    help="Number of hot functions to print per profiled step.")
+parser.add_argument('--startup-trace', action='store_const', const=True, default=False,
+                    help="Report the time spent in imports (module-level and lazy ones, e.g. of the backends).")
+parser.add_argument('--deltas', type=str, nargs='+', default=[], metavar='DELTA',
+                    help="Delta files (lines '+ u v cost cap', '- u v' or '~ u v cost') that are applied in place "
+                         "one after another to each imported graph. The methods are performed again after each "
+                         "delta, the results are listed as '<file> + <delta>'.")
 
 
-def run(arguments):
-    passed_values = parser.parse_args(arguments)
+def viewable(result) -> str:
+    viewable_result = str(result)
+    if len(viewable_result) > 1000:
+        viewable_result = viewable_result.splitlines()[0] + " (...OUTPUT HAS BEEN TRUNCATED!)"
+    return viewable_result
+
+
+# Result cache of this process (None if neither --results-only nor --result-cache-dir is given):
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache(passed_values):
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None and (passed_values.results_only or passed_values.result_cache_dir):
+            _result_cache = result_cache.ResultCache(cache_dir=passed_values.result_cache_dir,
+                                                     max_disk_size=int(passed_values.result_cache_size * 1024 ** 2))
+    return _result_cache
+
+
+def profile(passed_values, fn):
+    """Wraps fn with a new profiler if profiling is enabled.
+
+    Returns:
+        The (wrapped) function and the profiler (None if disabled).
+    """
+    if not passed_values.profile:
+        return fn, None
+    profiler = profiling.create_profiler(passed_values.profile)
+    return profiling.profiled(fn, profiler), profiler
+
+
+def save_profile(passed_values, profiler, file_name, backend, method):
+    """Writes the profile of (file_name, backend, method) and prints its hot functions."""
+    os.makedirs(passed_values.profile_dir, exist_ok=True)
+    path = profiling.profile_path(passed_values.profile_dir, file_name, backend, method, profiler)
+    profiler.dump(path)
+    print("\t\t🔥 Profile: {}".format(path))
+    for share, function in profiler.hot_functions(passed_values.profile_top_n):
+        print("\t\t   {:5.1f}% {}".format(share * 100, function))
+
+
+def check_memory_limit(passed_values, file_name, backend) -> bool:
+    """Checks the estimated memory usage of importing a graph using backend against the --memory-limit.
+
+    Returns:
+        Whether the graph needs to be imported into a memory-mapped file instead.
+
+    Raises:
+        footprint.MemoryLimitExceeded: If the graph must not be imported.
+    """
+    limit = passed_values.memory_limit * 1024 ** 2
+    estimate = footprint.estimate_import(os.path.join(passed_values.base_dir, file_name), backend,
+                                         passed_values.symmetric, passed_values.cache)
+    if estimate.peak <= limit:
+        return False
+    message = "Importing graph '{}' ({} nodes, ~{} edges) using '{}' backend needs ~{:.1f} MB, " \
+              "the limit is {} MB".format(file_name, estimate.node_count, estimate.edge_count, backend,
+                                          estimate.peak / 1024 ** 2, passed_values.memory_limit)
+    if passed_values.over_limit != MAPPED_STORAGE or backend == SHARED_BACKEND:
+        raise footprint.MemoryLimitExceeded(message + ".")
+    if footprint.estimate(MAPPED_STORAGE, estimate.node_count, estimate.edge_count) > limit:
+        raise footprint.MemoryLimitExceeded(message + ", even if it is memory-mapped.")
+    print("⚠ {}: Importing it into a memory-mapped file instead.".format(message))
+    return True
+
+
+def create_backend(backend, mutable=False):
+    """Creates an empty backend, one that edges can be removed from (by deltas) if mutable."""
+    if mutable and backend in MUTABLE_BACKEND_DISPATCH:
+        return MUTABLE_BACKEND_DISPATCH[backend]()
+    return BACKEND_DISPATCH[backend]()
+
+
+def import_cell(passed_values, importer, file_name, backend, mutable=None):
+    """Imports a graph using backend (or into a memory-mapped file if it exceeds the --memory-limit).
+
+    Args:
+        mutable: Whether deltas will be applied to the graph, defaults to whether --deltas are given.
+
+    Returns:
+        The graph (the file name for the stream backend) and info about it.
+
+    Raises:
+        footprint.MemoryLimitExceeded: If the graph exceeds the --memory-limit and must not be imported.
+    """
+    mapped = passed_values.memory_limit is not None and backend != STREAM_BACKEND and \
+        check_memory_limit(passed_values, file_name, backend)
+    print("↓ Importing graph '{}' using '{}' backend...".format(file_name, MAPPED_STORAGE if mapped else backend),
+          end=" ", flush=True)
+
+    edge_count = None
+
+    def import_graph():
+        nonlocal edge_count
+        if backend == STREAM_BACKEND:
+            return file_name  # Nothing to import, the stream methods read the file themselves
+        if mapped:
+            return mapped_graph.map_mmi_file(importer, file_name, not passed_values.symmetric, passed_values.spill_dir)
+        data = importer.parse(file_name)
+        edge_count = len(data.sources)  # Counting the edges of a built graph can be slow (see footprint.edge_count)
+        if backend == SHARED_BACKEND:
+            return shared_graph.export_mmi_data(data, not passed_values.symmetric)
+        is_mutable = bool(passed_values.deltas) if mutable is None else mutable
+        return build_graph(create_backend(backend, is_mutable), data, not passed_values.symmetric)
+
+    timeit_result = benchmark(import_graph, status_fn=lambda n, t: print("Took", t, "ms."), cleanup_fn=None)
+    graph = timeit_result['return']
+    if passed_values.profile:
+        # Profiled in a separate import, so that the profiler's overhead does not end up in the timing:
+        profiled_import, profiler = profile(passed_values, import_graph)
+        release_graph(backend, profiled_import(), {'storage': MAPPED_STORAGE} if mapped else {})
+        save_profile(passed_values, profiler, file_name, backend, 'import')
+    graph_info = {'file_size': os.path.getsize(os.path.join(passed_values.base_dir, file_name)),
+                  'nodes': importer.read_header(file_name)[0] if backend == STREAM_BACKEND else len(graph)}
+    if edge_count is not None:
+        graph_info['edges'] = edge_count
+    if mapped:
+        graph_info['storage'] = MAPPED_STORAGE
+    if passed_values.graph_size and backend != STREAM_BACKEND:
+        if passed_values.graph_size == 'exact':
+            print("\t💾 Backend: {} - recursively measuring graph size...".format(backend), end="", flush=True)
+            size = registry.import_object('grapresso.tools.memory:getsize')(graph)
+        else:
+            size = footprint.estimate_graph(graph, graph_info.get('storage', backend), passed_values.symmetric,
+                                            graph_info.get('edges'))
+        print("\r\t💾 Backend: {} - {} graph size:".format(
+            backend, "approximated" if passed_values.graph_size == 'exact' else "estimated"),
+            size, "Byte |", size / 1000 ** 2, "Megabyte")
+        graph_info['graph_size'] = size
+    if get_result_cache(passed_values) and backend != STREAM_BACKEND:
+        graph_info['content_hash'] = result_cache.graph_hash(graph)
+    return graph, graph_info
+
+
+def run_method(passed_values, importer, file_name, backend, graph, graph_info, n_method):
+    """Performs <n>*<method> on an imported graph.
+
+    Returns:
+        The method's name and its timings.
+    """
+    n, method = (n_method if '*' in n_method else '1*' + n_method).strip().split('*')
+    print("\t➤ Performing {method} {n} time(s).".format(method=method, n=n), flush=True)
+
+    args = (passed_values.start,) if passed_values.start is not None and method in START_METHODS else ()
+    cache = get_result_cache(passed_values) if backend != STREAM_BACKEND else None
+    runners = []
+    if backend == STREAM_BACKEND:
+        def method_fn():
+            return STREAM_METHOD_DISPATCH[method](importer, graph)
+    elif passed_values.sources and method in MULTI_SOURCE_METHODS:
+        sources = multi_source.parse_sources(passed_values.sources, len(graph))
+        args = ('sources',) + tuple(sources)
+        output = None
+        if passed_values.distances:
+            output_format, output_dir = passed_values.distances
+            os.makedirs(output_dir, exist_ok=True)
+            output = output_format, os.path.join(output_dir, "{}.{}.{}.{}".format(
+                os.path.basename(file_name), backend, method, output_format))
+            cache = None  # The result is just the number of rows, a cached one would not write the file
+        elif len(sources) * len(graph) > multi_source.MAX_CACHED_DISTANCES:
+            cache = None
+
+        def runner():
+            # The adjacency snapshot (and process pool) is set up once, not per run, and not at all on a cache hit:
+            if not runners:
+                runners.append(multi_source.MultiSourceRunner(graph, passed_values.source_jobs))
+            return runners[0]
+
+        if not passed_values.results_only:
+            runner()  # Timed runs never read from the result cache, so set it up before they are measured
+
+        def method_fn():
+            return runner().distances(method, sources, output)
+    else:
+        def method_fn():
+            return METHOD_DISPATCH[method](graph, *args)
+
+    try:
+        return method, _measure_method(passed_values, file_name, backend, graph_info, int(n), method, method_fn,
+                                       args, cache)
+    finally:
+        for runner in runners:
+            runner.close()
+
+
+def _measure_method(passed_values, file_name, backend, graph_info, n, method, method_fn, args, cache):
+    if passed_values.results_only:
+        cached, result = cache.call(graph_info['content_hash'], method, lambda *_: method_fn(), *args) \
+            if cache else (False, method_fn())
+        print("\t\t∑ Result{}:".format(" (cached)" if cached else ""), viewable(result))
+        return {'return': result, 'cached': cached, 'graph': graph_info}
+
+    timeit_result = benchmark(method_fn, n,
+                              lambda n, t: print("\r\t\t🏃 Run #", n + 1, "took", t, "ms.", end="",
+                                                 flush=True),
+                              lambda r: print("\r\t\t⌛ Timings (ms): "
+                                              "[o] {avg:.5f} | [+] {fastest} | [-] {slowest} | "
+                                              "[~] {median:.5f} | IQR {iqr:.5f} | σ {stdev:.5f} "
+                                              "({n} runs)".format(n=len(r['runs']), **r)),
+                              warmup=passed_values.warmup, disable_gc=passed_values.no_gc,
+                              target_ci=passed_values.target_ci, time_budget=passed_values.time_budget,
+                              max_runs=passed_values.max_runs or DEFAULT_MAX_RUNS)
+    if passed_values.profile:
+        # Profiled separately, so that the profiler's overhead does not end up in the timings:
+        profiled_fn, profiler = profile(passed_values, method_fn)
+        profiled_fn()
+        save_profile(passed_values, profiler, file_name, backend, method)
+    if passed_values.report:
+        # Measured in an extra run as well, tracemalloc would slow down the timed ones:
+        _, timeit_result['peak_memory'] = report.peak_memory(method_fn)
+        print("\t\t💾 Peak memory:", timeit_result['peak_memory'], "Byte")
+    timeit_result['graph'] = graph_info
+    if cache:
+        cache.put(result_cache.result_key(graph_info['content_hash'], method, *args), timeit_result['return'],
+                  graph_info['content_hash'])
+    print("\t\t∑ Result:", viewable(timeit_result['return']))
+    return timeit_result
+
+
+def delta_step(file_name, delta) -> str:
+    return "{} + {}".format(file_name, delta)
+
+
+def steps(passed_values, file_name):
+    """Names of the graph versions of a file: The imported graph and the graph after each delta."""
+    return [file_name] + [delta_step(file_name, delta) for delta in passed_values.deltas]
 
-    print("Arguments:", passed_values, "\n")
 
-    importer = MmiImporter(passed_values.base_dir)
-    file_names = passed_values.files
-    results = {}
-    for file_name in file_names:
-        results[file_name] = {}
-        for backend in passed_values.backends:
-            results[file_name][backend] = {}
-            print("↓ Importing graph '{}' using '{}' backend...".format(file_name, backend), end=" ", flush=True)
-
-            def import_graph():
-                if backend == 'file':
-                    directory = os.path.abspath(os.path.join(os.path.dirname(__file__),
-                                                             "./res/example-graphs/serialized/" + file_name))
-                    if os.path.exists(directory):
-                        print("Info: Graph already exists in a serialized form (dir: {}).".format(directory))
-                        if passed_values.symmetric:
-                            return UnDiGraph(BACKEND_DISPATCH[backend]())
-                        else:
-                            return DiGraph(BACKEND_DISPATCH[backend]())
+def apply_delta(passed_values, importer, graph, graph_info, delta):
+    """Applies a delta file to an imported graph in place.
+
+    Returns:
+        Info about the modified graph.
+    """
+    print("Δ Applying delta '{}'...".format(delta), end=" ", flush=True)
+    cache = get_result_cache(passed_values)
+    timeit_result = benchmark(lambda: importer.apply_delta(graph, delta, cache, graph_info.get('content_hash')),
+                              status_fn=lambda n, t: print("Took", t, "ms."), cleanup_fn=None)
+    applied = timeit_result['return']
+    print("\t+{} -{} ~{} edge(s).".format(applied.added, applied.removed, applied.reweighted))
+    graph_info = dict(graph_info, nodes=len(graph))
+    graph_info.pop('graph_size', None)
+    if 'edges' in graph_info:
+        graph_info['edges'] += applied.added - applied.removed
+    if applied.content_hash:
+        graph_info['content_hash'] = applied.content_hash
+    return graph_info
+
+
+def release_graph(backend, graph, graph_info):
+    """Releases the shared memory of a graph of the shm backend, or the file of a memory-mapped graph."""
+    if backend == SHARED_BACKEND or graph_info.get('storage') == MAPPED_STORAGE:
+        graph.backend.close()
+
+
+def run_cell(passed_values, importer, file_name, backend):
+    """Imports a graph using backend and performs all methods on it (one cell of the timing table),
+    then again after each delta.
+
+    Returns:
+        The results of all methods per step (see `steps`), none if the graph exceeds the --memory-limit.
+    """
+    try:
+        graph, graph_info = import_cell(passed_values, importer, file_name, backend)
+    except footprint.MemoryLimitExceeded as e:
+        print("✗ {}".format(e))
+        return {}
+    cell_results = {}
+    try:
+        for step, delta in zip(steps(passed_values, file_name), [None] + passed_values.deltas):
+            if delta:
+                graph_info = apply_delta(passed_values, importer, graph, graph_info, delta)
+            cell_results[step] = dict(run_method(passed_values, importer, file_name, backend, graph, graph_info,
+                                                 n_method) for n_method in passed_values.methods)
+        return cell_results
+    finally:
+        release_graph(backend, graph, graph_info)
+
+
+def _init_worker(cores, worker_counter):
+    with worker_counter.get_lock():
+        worker_no = worker_counter.value
+        worker_counter.value += 1
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cores[worker_no % len(cores)]})
+
+
+def sendable(timeit_result):
+    """Makes the result of a method sendable to other processes (or clients of the graph server) in place:
+    Complex results (e.g. tours) reference the whole graph, so only primitive ones are kept as-is.
+
+    Returns:
+        timeit_result
+    """
+    if not isinstance(timeit_result['return'], (int, float, str, bool, type(None))):
+        timeit_result['return'] = viewable(timeit_result['return'])
+    return timeit_result
+
+
+def _run_cell_in_worker(passed_values, file_name, backend):
+    importer = MmiImporter(passed_values.base_dir, passed_values.cache, passed_values.cache_dir)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        cell_results = run_cell(passed_values, importer, file_name, backend)
+    for step_results in cell_results.values():
+        for timeit_result in step_results.values():
+            sendable(timeit_result)
+    return file_name, backend, cell_results, output.getvalue()
+
+
+# Shared graphs attached by this worker (by name), they stay mapped until the worker exits:
+_attached_graphs = {}
+
+
+def _run_shared_method_in_worker(passed_values, file_name, shm_name, graph_info, n_method):
+    if shm_name not in _attached_graphs:
+        _attached_graphs[shm_name] = shared_graph.attach(shm_name)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print("⇄ Graph '{}' ({} backend):".format(file_name, SHARED_BACKEND))
+        method, timeit_result = run_method(passed_values, None, file_name, SHARED_BACKEND,
+                                           _attached_graphs[shm_name], graph_info, n_method)
+    return file_name, SHARED_BACKEND, {file_name: {method: sendable(timeit_result)}}, output.getvalue()
+
+
+def run_parallel(passed_values, results):
+    """Spreads the (file, backend) cells across a process pool and merges the timings into results.
+    Workers are pinned to distinct cores so that they do not compete for the same core during measurement.
+
+    Graphs of the shm backend are imported once by this process, each of their methods is a task of its own.
+    """
+    import multiprocessing  # Like the process pool, only imported for parallel runs
+
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+    cells = [(file_name, backend) for file_name in passed_values.files for backend in passed_values.backends]
+    shared_cells = [(file_name, backend) for file_name, backend in cells if backend == SHARED_BACKEND]
+    tasks = len(cells) - len(shared_cells) + len(shared_cells) * len(passed_values.methods)
+    workers = max(1, min(passed_values.jobs, len(cores), tasks))
+    if passed_values.memory_limit is not None:
+        # Every worker imports its own graph, and this process imports the graphs of the shm backend meanwhile:
+        importing = min(workers, len(cells) - len(shared_cells)) + (1 if shared_cells else 0)
+        passed_values = argparse.Namespace(**dict(vars(passed_values),
+                                                  memory_limit=passed_values.memory_limit / importing))
+        print("Memory limit per importing process: {:.1f} MB".format(passed_values.memory_limit))
+
+    importer = MmiImporter(passed_values.base_dir, passed_values.cache, passed_values.cache_dir)
+    shared_graphs = []
+    try:
+        with concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker,
+                                                    initargs=(cores, multiprocessing.Value('i', 0))) as executor:
+            futures = []
+            for file_name, backend in cells:
+                if backend != SHARED_BACKEND:
+                    futures.append(executor.submit(_run_cell_in_worker, passed_values, file_name, backend))
+                    continue
+                try:
+                    graph, graph_info = import_cell(passed_values, importer, file_name, backend)
+                except footprint.MemoryLimitExceeded as e:
+                    print("✗ {}".format(e))
+                    continue
+                shared_graphs.append(graph)
+                # Keep the order of the methods, no matter which one finishes first:
+                results[file_name][backend] = {n_method.split('*')[-1].strip(): None
+                                               for n_method in passed_values.methods}
+                futures.extend(executor.submit(_run_shared_method_in_worker, passed_values, file_name,
+                                               graph.backend.name, graph_info, n_method)
+                               for n_method in passed_values.methods)
+            print()
+            for future in concurrent.futures.as_completed(futures):
+                file_name, backend, cell_results, output = future.result()
+                print(output)
+                for step, step_results in cell_results.items():
+                    if backend == SHARED_BACKEND:
+                        results[step][backend].update(step_results)
                     else:
-                        return importer.read_graph(BACKEND_DISPATCH[backend](), file_name,
-                                                   not passed_values.symmetric)
-                else:
-                    return importer.read_graph(BACKEND_DISPATCH[backend](), file_name, not passed_values.symmetric)
-
-            timeit_result = timeit(import_graph, status_fn=lambda n, t: print("Took", t, "ms."), cleanup_fn=None)
-            graph = timeit_result['return']
-            if passed_values.graph_size:
-                size = getsize(graph)
-                print("\t💾 Backend: {} - recursively measuring graph size...".format(backend), end="", flush=True)
-                print("\r\t💾 Backend: {} - approximated graph size:".format(backend),
-                      getsize(graph), "Byte |", size / 1000 ** 2, "Megabyte")
-
-            for n_method in passed_values.methods:
-                n, method = (n_method if '*' in n_method else '1*' + n_method).strip().split('*')
-                print("\t➤ Performing {method} {n} time(s).".format(method=method, n=n), flush=True)
-
-                timeit_result = timeit(lambda: METHOD_DISPATCH[method](graph), int(n),
-                                       lambda n, t: print("\r\t\t🏃 Run #", n + 1, "took", t, "ms.", end="",
-                                                          flush=True),
-                                       lambda r: print("\r\t\t⌛ Timings (ms): "
-                                                       "[o] {avg} | [+] {fastest} | [-] {slowest}".format(**r)))
-                viewable_result = str(timeit_result['return'])
-                if len(viewable_result) > 1000:
-                    viewable_result = viewable_result.splitlines()[0] + " (...OUTPUT HAS BEEN TRUNCATED!)"
-                print("\t\t∑ Result:", viewable_result)
-                results[file_name][backend][method] = timeit_result
-        print()
-    methods = ""
-    for m in passed_values.methods:
-        methods += m.ljust(26)
-    print("Timing tables:")
+                        results[step][backend] = step_results
+    finally:
+        for graph in shared_graphs:
+            graph.backend.close()
+
+
+def print_timing_tables(results, methods):
+    print("Timing tables (avg, below: median ± IQR / σ):")
     for file_name in results:
         print(file_name.ljust(25), '/', methods)
         for be in results[file_name]:
@@ -114,9 +569,122 @@ def run(arguments):
             for method in results[file_name][be]:
                 print(str(round(results[file_name][be][method]['avg'], 3)).ljust(25), end=' ')
             print()
+            print(''.ljust(26), end='| ')
+            for method in results[file_name][be]:
+                print("{} ± {} / {}".format(*(round(results[file_name][be][method][k], 3)
+                                              for k in ('median', 'iqr', 'stdev'))).ljust(25), end=' ')
+            print()
+        print()
+
+
+def print_result_tables(results, methods):
+    print("Result tables (cached results are marked with *):")
+    for file_name in results:
+        print(file_name.ljust(25), '/', methods)
+        for be in results[file_name]:
+            print(be.ljust(26), end='| ')
+            for method in results[file_name][be]:
+                result = results[file_name][be][method]
+                print((viewable(result['return'])[:23] + ('*' if result['cached'] else '')).ljust(25), end=' ')
+            print()
         print()
+
+
+def print_startup_trace():
+    trace = registry.import_trace()
+    print("Startup trace (imports):")
+    for module, seconds in trace:
+        print("\t{:9.3f} ms  {}".format(seconds * 1000, module))
+    print("\t{:9.3f} ms  total".format(sum(seconds for _, seconds in trace) * 1000))
+
+
+def run(arguments):
+    global _result_cache
+    passed_values = parser.parse_args(arguments)
+    _result_cache = None
+    if passed_values.report and passed_values.report[0] not in report.REPORT_FORMATS:
+        parser.error("argument --report: invalid format '{}' (choose from {})".format(
+            passed_values.report[0], ", ".join(report.REPORT_FORMATS)))
+    if STREAM_BACKEND in passed_values.backends:
+        for n_method in passed_values.methods:
+            if n_method.split('*')[-1] not in STREAM_METHOD_DISPATCH:
+                parser.error("method '{}' is not supported by the '{}' backend".format(n_method, STREAM_BACKEND))
+    if passed_values.sources and passed_values.start is not None:
+        parser.error("argument --sources: not allowed with --start")
+    if passed_values.sources and STREAM_BACKEND in passed_values.backends:
+        parser.error("argument --sources: not supported by the '{}' backend".format(STREAM_BACKEND))
+    if passed_values.sources:
+        for n_method in passed_values.methods:
+            if n_method.split('*')[-1].strip() not in MULTI_SOURCE_METHODS:
+                parser.error("argument --sources: method '{}' does not support it (only: {})".format(
+                    n_method, ", ".join(MULTI_SOURCE_METHODS)))
+    if passed_values.distances and passed_values.distances[0] not in multi_source.OUTPUT_FORMATS:
+        parser.error("argument --distances: invalid format '{}' (choose from {})".format(
+            passed_values.distances[0], ", ".join(multi_source.OUTPUT_FORMATS)))
+    if passed_values.distances and not passed_values.sources:
+        parser.error("argument --distances: requires --sources")
+    for option in ('time_budget', 'max_runs'):
+        if getattr(passed_values, option) is not None and passed_values.target_ci is None:
+            parser.error("argument --{}: requires --target-ci (adaptive mode)".format(option.replace('_', '-')))
+    if passed_values.results_only and passed_values.compare:
+        parser.error("argument --compare: not allowed with --results-only (there are no timings to compare)")
+    for backend in (STREAM_BACKEND, SHARED_BACKEND):
+        if passed_values.deltas and backend in passed_values.backends:
+            parser.error("argument --deltas: not supported by the '{}' backend (it cannot be modified)".format(backend))
+
+    print("Arguments:", passed_values, "\n")
+
+    results = {step: {backend: {} for backend in passed_values.backends}
+               for file_name in passed_values.files for step in steps(passed_values, file_name)}
+    if passed_values.jobs > 1:
+        run_parallel(passed_values, results)
+    else:
+        importer = MmiImporter(passed_values.base_dir, passed_values.cache, passed_values.cache_dir)
+        for file_name in passed_values.files:
+            for backend in passed_values.backends:
+                for step, step_results in run_cell(passed_values, importer, file_name, backend).items():
+                    results[step][backend] = step_results
+            print()
+    methods = ""
+    for m in passed_values.methods:
+        methods += m.ljust(26)
+    if passed_values.results_only:
+        print_result_tables(results, methods)
+    else:
+        print_timing_tables(results, methods)
+
+    records = report.records_from_results(results)
+    if passed_values.report:
+        report_format, report_path = passed_values.report
+        report.write_report(records, report_path, report_format)
+        print("Report written to '{}'.".format(report_path))
+    if passed_values.compare:
+        baseline = report.read_report(passed_values.compare)
+        mismatches = report.storage_mismatches(records, baseline)
+        for record, base in mismatches:
+            print("✗ Not comparable: {file} / {backend} / {method}".format(**record),
+                  "stored the graph in '{}' vs. '{}' in the baseline".format(record['storage'] or record['backend'],
+                                                                             base['storage'] or base['backend']))
+        regressions = report.compare(records, baseline, passed_values.compare_threshold)
+        for record, base, ratio in regressions:
+            print("✗ Regression: {file} / {backend} / {method}: {avg} ms".format(**record),
+                  "vs. {} ms (x{})".format(base['avg'], round(ratio, 3)))
+        if mismatches:
+            parser.exit(1, "{} method(s) could not be compared, their graph storage differs from the baseline.\n"
+                        .format(len(mismatches)))
+        if regressions:
+            parser.exit(1, "{} method(s) regressed by more than {}%.\n".format(
+                len(regressions), passed_values.compare_threshold * 100))
+        print("✓ No regressions compared to '{}'.".format(passed_values.compare))
+    if passed_values.startup_trace:
+        print_startup_trace()
     return results
 
 
 if __name__ == "__main__":
-    run(sys.argv[1:])
+    if sys.argv[1:2] == ['serve']:
+        from grapresso_cli import server  # Not at module level since the server builds upon this module
+
+        server.main(sys.argv[2:])
+    else:
+        run(sys.argv[1:])
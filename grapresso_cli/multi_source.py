@@ -0,0 +1,248 @@
+""" Batched shortest paths from many sources (see mmi_cli.py --sources).
+
+Instead of one `perform_dijkstra`/`perform_bellman_ford` call (and distance table) per source, all sources of a batch
+share one CSR snapshot of the graph's adjacency (see `CsrView`), which is built once. With several jobs, the snapshot
+is exported to shared memory and the sources are spread across a process pool in chunks.
+
+The result per source is a distance row: The distances from the source to the nodes 0..n-1 (inf if unreachable).
+Rows are produced in the order of the sources and can be streamed to a file instead of being kept in memory:
+- bin: Header (magic, node count, row count), then per row the source (int64) and the distances (double[n])
+- csv: Header line `source,0,1,...,n-1`, then one line per row
+"""
+
+import csv
+import itertools
+import struct
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappush, heappop
+from math import inf
+from typing import List, Iterable, Iterator, Tuple, Dict, Union
+
+from grapresso_cli import shared_graph
+from grapresso_cli.backends.csr import CsrView
+
+OUTPUT_FORMATS = ('bin', 'csv')
+
+BINARY_HEADER = struct.Struct('=4sqq')
+BINARY_MAGIC = b'GDST'
+
+# Upper bound of the sources per task of the process pool:
+MAX_CHUNK_SIZE = 64
+
+# Distance tables with more entries (sources × nodes) are not put into the result cache, where they would crowd out
+# all other results (stream them to a file with mmi_cli.py --distances instead):
+MAX_CACHED_DISTANCES = 100000
+
+
+def parse_sources(specs: Iterable[str], node_count) -> List[int]:
+    """Parses source specifications: Node numbers, ranges `<from>:<to>` (to is exclusive) or `all`.
+
+    Raises:
+        ValueError: If a specification is malformed or refers to a node that is not in 0..node_count-1.
+    """
+    sources = []
+    for spec in specs:
+        try:
+            if spec == 'all':
+                sources.extend(range(node_count))
+            elif ':' in spec:
+                start, _, stop = spec.partition(':')
+                sources.extend(range(int(start), int(stop)))
+            else:
+                sources.append(int(spec))
+        except ValueError:
+            raise ValueError("Malformed source '{}' (expected a node, <from>:<to> or 'all').".format(spec)) from None
+    for source in sources:
+        if not 0 <= source < node_count:
+            raise ValueError("Source {} is not a node of the graph (0..{}).".format(source, node_count - 1))
+    return sources
+
+
+def dijkstra_row(csr: CsrView, source) -> array:
+    """Distances from source to all nodes, costs must not be negative."""
+    offsets, targets, costs = csr.offsets, csr.targets, csr.costs
+    dist = array('d', [inf]) * (len(offsets) - 1)
+    dist[source] = 0.0
+    queue = [(0.0, source)]
+    while queue:
+        d, u = heappop(queue)
+        if d > dist[u]:
+            continue  # Outdated entry, u has been reached cheaper in the meantime
+        for pos in range(offsets[u], offsets[u + 1]):
+            v, new_distance = targets[pos], d + costs[pos]
+            if new_distance < dist[v]:
+                dist[v] = new_distance
+                heappush(queue, (new_distance, v))
+    return dist
+
+
+def bellman_ford_row(csr: CsrView, source) -> array:
+    """Distances from source to all nodes (Moore-Bellman-Ford), costs may be negative.
+
+    Raises:
+        ValueError: If a negative cycle is reachable from source.
+    """
+    offsets, targets, costs = csr.offsets, csr.targets, csr.costs
+    node_count = len(offsets) - 1
+    dist = array('d', [inf]) * node_count
+    dist[source] = 0.0
+    # The distances are final after n - 1 passes at the latest, any update in the n-th pass is due to a negative cycle:
+    for _ in range(node_count):
+        updated = False
+        for u in range(node_count):
+            d = dist[u]
+            if d == inf:
+                continue
+            for pos in range(offsets[u], offsets[u + 1]):
+                v, new_distance = targets[pos], d + costs[pos]
+                if new_distance < dist[v]:
+                    dist[v] = new_distance
+                    updated = True
+        if not updated:
+            return dist
+    raise ValueError("There is a negative cycle reachable from source {}.".format(source))
+
+
+METHODS = {'dijkstra': dijkstra_row, 'mbf': bellman_ford_row}
+
+# Snapshot attached by a worker of the process pool:
+_worker_csr = None
+
+
+def _attach_worker(shm_name):
+    global _worker_csr
+    _worker_csr = shared_graph.attach(shm_name).backend
+
+
+def _rows_in_worker(method, sources) -> List[array]:
+    return [METHODS[method](_worker_csr, source) for source in sources]
+
+
+class DistanceRowWriter:
+    """Streams distance rows to a file in one of the `OUTPUT_FORMATS`."""
+
+    def __init__(self, path, output_format, node_count):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError("Unknown output format '{}' (choose from {}).".format(
+                output_format, ", ".join(OUTPUT_FORMATS)))
+        self.rows = 0
+        self._binary = output_format == 'bin'
+        if self._binary:
+            self._file = open(path, 'wb')
+            self._file.write(BINARY_HEADER.pack(BINARY_MAGIC, node_count, 0))
+        else:
+            self._file = open(path, 'w', newline='')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(itertools.chain(('source',), range(node_count)))
+
+    def write(self, source, row: array):
+        if self._binary:
+            self._file.write(struct.pack('=q', source))
+            row.tofile(self._file)
+        else:
+            self._csv.writerow(itertools.chain((source,), row))
+        self.rows += 1
+
+    def close(self):
+        if self._binary:
+            self._file.seek(BINARY_HEADER.size - 8)
+            self._file.write(struct.pack('=q', self.rows))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_binary_rows(path) -> Iterator[Tuple[int, array]]:
+    """Reads the (source, distance row) pairs of a binary distance file."""
+    with open(path, 'rb') as f:
+        magic, node_count, row_count = BINARY_HEADER.unpack(f.read(BINARY_HEADER.size))
+        if magic != BINARY_MAGIC:
+            raise ValueError("'{}' is not a binary distance file.".format(path))
+        for _ in range(row_count):
+            source, = struct.unpack('=q', f.read(8))
+            row = array('d')
+            row.fromfile(f, node_count)
+            yield source, row
+
+
+class MultiSourceRunner:
+    """Computes the distance rows of many sources over one adjacency snapshot of a graph (with the node names 0..n-1).
+
+    Args:
+        graph: The graph, graphs of the shm backend are used as they are.
+        jobs: Number of worker processes, the snapshot is only exported to shared memory if greater than 1.
+    """
+
+    def __init__(self, graph, jobs=1):
+        self._jobs = jobs
+        self._exported = None
+        backend = graph.backend
+        if isinstance(backend, shared_graph.SharedCsrView):
+            self._csr = backend
+        elif jobs > 1:
+            self._csr = self._exported = shared_graph.export_graph(graph).backend
+        else:
+            self._csr = CsrView(*shared_graph.graph_columns(graph))
+        self._executor = ProcessPoolExecutor(jobs, initializer=_attach_worker, initargs=(self._csr.name,)) \
+            if jobs > 1 else None
+
+    @property
+    def node_count(self):
+        return len(self._csr)
+
+    def rows(self, method, sources: List[int]) -> Iterator[Tuple[int, array]]:
+        """Yields the (source, distance row) pairs in the order of sources.
+        Only a few chunks per worker are in flight at a time, so the rows do not pile up in memory.
+        """
+        row_fn = METHODS[method]
+        if self._executor is None:
+            for source in sources:
+                yield source, row_fn(self._csr, source)
+            return
+        chunk_size = max(1, min(MAX_CHUNK_SIZE, len(sources) // (4 * self._jobs)))
+        chunks = (sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size))
+        pending = deque((chunk, self._executor.submit(_rows_in_worker, method, chunk))
+                        for chunk in itertools.islice(chunks, 2 * self._jobs))
+        while pending:
+            chunk, future = pending.popleft()
+            rows = future.result()
+            for next_chunk in itertools.islice(chunks, 1):
+                pending.append((next_chunk, self._executor.submit(_rows_in_worker, method, next_chunk)))
+            yield from zip(chunk, rows)
+
+    def distances(self, method, sources: List[int], output=None) -> Union[Dict[int, List[float]], int]:
+        """Computes the distance rows of all sources.
+
+        Args:
+            method: One of `METHODS`.
+            sources: Source nodes.
+            output: Optional (format, path) to stream the rows to instead of returning them.
+
+        Returns:
+            The distance row per source, the number of written rows if output is given.
+        """
+        if output is None:
+            return {source: row.tolist() for source, row in self.rows(method, sources)}
+        output_format, path = output
+        with DistanceRowWriter(path, output_format, self.node_count) as writer:
+            for source, row in self.rows(method, sources):
+                writer.write(source, row)
+        return writer.rows
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        if self._exported is not None:
+            self._exported.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
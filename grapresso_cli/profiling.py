@@ -0,0 +1,112 @@
+""" Profilers for the CLI's import and method steps.
+
+- cprofile: Deterministic profile of every call, written as `.pstats` file (e.g. for `snakeviz` or `pstats`).
+- sample: Statistical profile that periodically samples the stack of the profiled thread, written as collapsed
+  stacks (`.collapsed`, one "frame;frame;frame count" line per stack, the input format of `flamegraph.pl`).
+
+Profilers are enabled around each profiled call only, so the surrounding timing code is not part of the profile.
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from typing import List, Tuple
+
+PROFILERS = ('cprofile', 'sample')
+
+
+class CProfileProfiler:
+    ext = '.pstats'
+
+    def __init__(self):
+        import cProfile  # Like pstats, only imported when profiling (they are slow to import)
+
+        self._profile = cProfile.Profile()
+
+    def enable(self):
+        self._profile.enable()
+
+    def disable(self):
+        self._profile.disable()
+
+    def dump(self, path):
+        self._profile.dump_stats(path)
+
+    def hot_functions(self, top_n=5) -> List[Tuple[float, str]]:
+        """Functions with the highest own time (share of the total time, function)."""
+        import pstats
+
+        stats = pstats.Stats(self._profile).stats
+        total = sum(tottime for _, _, tottime, _, _ in stats.values()) or 1.0
+        hottest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top_n]
+        return [(tottime / total, "{} ({}:{}) {} calls".format(func, os.path.basename(file_name), line, calls))
+                for (file_name, line, func), (_, calls, tottime, _, _) in hottest]
+
+
+class SamplingProfiler:
+    ext = '.collapsed'
+
+    def __init__(self, interval=0.001):
+        self._interval = interval
+        self._stacks = Counter()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def enable(self):
+        """Starts sampling the calling thread."""
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample, args=(threading.get_ident(),),
+                                         name='profile-sampler', daemon=True)
+        self._sampler.start()
+
+    def disable(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def _sample(self, thread_id):
+        while not self._stopped.wait(self._interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename),
+                                                 code.co_firstlineno))
+                frame = frame.f_back
+            if not self._stopped.is_set():  # Otherwise the sample might show disable() instead of the profiled call
+                self._stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'wt') as file:
+            for stack, count in self._stacks.items():
+                file.write("{} {}\n".format(stack, count))
+
+    def hot_functions(self, top_n=5) -> List[Tuple[float, str]]:
+        """Functions that were on top of the stack most often (share of all samples, function)."""
+        own_samples = Counter()
+        for stack, count in self._stacks.items():
+            own_samples[stack.rsplit(';', 1)[-1]] += count
+        total = sum(own_samples.values()) or 1
+        return [(count / total, func) for func, count in own_samples.most_common(top_n)]
+
+
+def create_profiler(kind):
+    return {'cprofile': CProfileProfiler, 'sample': SamplingProfiler}[kind]()
+
+
+def profiled(fn: callable, profiler) -> callable:
+    """Wraps fn so that the profiler is only enabled while fn runs."""
+
+    def profiled_fn():
+        profiler.enable()
+        try:
+            return fn()
+        finally:
+            profiler.disable()
+
+    return profiled_fn
+
+
+def profile_path(profile_dir, file_name, backend, method, profiler) -> str:
+    """Path of the profile of (file, backend, method), e.g. `K_10.mmiw.mem.kruskal.pstats`."""
+    return os.path.join(profile_dir, "{}.{}.{}{}".format(os.path.basename(file_name), backend, method, profiler.ext))
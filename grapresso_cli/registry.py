@@ -0,0 +1,70 @@
+""" Lazy resolution of the CLI's backends, methods and heavy modules, so that a run only imports what it uses.
+
+Every first import that goes through this module is timed, see `import_trace` (and mmi_cli's --startup-trace).
+"""
+
+import importlib
+import sys
+from collections.abc import Mapping
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+# (module, seconds) of every module that has been imported through this module, in import order:
+_import_trace = []
+
+
+def import_module(name):
+    """Like `importlib.import_module`, but the time of a first import is traced."""
+    module = sys.modules.get(name)
+    if module is None:
+        started = perf_counter()
+        module = importlib.import_module(name)
+        _import_trace.append((name, perf_counter() - started))
+    return module
+
+
+def import_object(path) -> Any:
+    """Imports the object at path, e.g. `grapresso.components.graph:UnDiGraph.perform_kruskal`."""
+    module_name, _, qualified_name = path.partition(':')
+    obj = import_module(module_name)
+    for name in qualified_name.split('.') if qualified_name else ():
+        obj = getattr(obj, name)
+    return obj
+
+
+def trace_import(name, seconds):
+    """Adds an import that has not been done through this module (e.g. module-level imports) to the trace."""
+    _import_trace.append((name, seconds))
+
+
+def import_trace() -> List[Tuple[str, float]]:
+    return list(_import_trace)
+
+
+class LazyModule:
+    """Stands in for a module, which is only imported once one of its attributes is accessed."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(import_module(self._name), attribute)
+
+
+class LazyRegistry(Mapping):
+    """Maps names to the paths of objects (see `import_object`), which are only imported when they are looked up."""
+
+    def __init__(self, paths: Dict[str, str]):
+        self._paths = dict(paths)
+        self._objects = {}
+
+    def __getitem__(self, name):
+        if name not in self._objects:
+            self._objects[name] = import_object(self._paths[name])
+        return self._objects[name]
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
@@ -0,0 +1,139 @@
+""" Machine-readable export of benchmark results and comparison against a baseline report.
+
+A report consists of environment info and one record per (file, backend, method) with all timing samples and the
+memory that the method allocated at its peak (`peak_memory`).
+"""
+
+import csv
+import json
+import os
+import platform
+import socket
+import sys
+from typing import List, Dict, Any, Tuple
+
+REPORT_FORMATS = ('json', 'csv')
+KEY_FIELDS = ('file', 'backend', 'method')
+TIMING_FIELDS = ('avg', 'fastest', 'slowest', 'median', 'iqr', 'stdev', 'peak_memory')
+# storage is only set if the graph is not stored by its backend (e.g. 'mmap', see mmi_cli.py --over-limit):
+GRAPH_FIELDS = ('nodes', 'file_size', 'graph_size', 'storage')
+TEXT_FIELDS = ('storage',)
+RECORD_FIELDS = KEY_FIELDS + TIMING_FIELDS + GRAPH_FIELDS
+
+Record = Dict[str, Any]
+
+
+def environment_info() -> Dict[str, Any]:
+    try:
+        from importlib.metadata import version
+        grapresso_version = version('grapresso')
+    except Exception:
+        grapresso_version = None
+    return {'python': sys.version.split()[0], 'implementation': platform.python_implementation(),
+            'platform': platform.platform(), 'machine': platform.machine(), 'processor': platform.processor(),
+            'cpu_count': os.cpu_count(), 'host': socket.gethostname(), 'grapresso': grapresso_version}
+
+
+def peak_memory(fn: callable) -> Tuple[Any, int]:
+    """Calls fn and measures the peak of the memory that Python allocates meanwhile (using tracemalloc,
+    which slows down allocations, so do not time this call).
+
+    Returns:
+        The result of fn and the peak memory increase during the call in bytes.
+    """
+    import tracemalloc
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1] - start
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def records_from_results(results) -> List[Record]:
+    """Flattens the CLI's nested results[file][backend][method] dict."""
+    records = []
+    for file_name, backends in results.items():
+        for backend, methods in backends.items():
+            for method, timeit_result in methods.items():
+                record = {'file': file_name, 'backend': backend, 'method': method}
+                record.update({k: timeit_result.get(k) for k in TIMING_FIELDS})
+                record.update({k: timeit_result.get('graph', {}).get(k) for k in GRAPH_FIELDS})
+                record['runs'] = timeit_result.get('runs', [])
+                records.append(record)
+    return records
+
+
+def write_report(records: List[Record], path, fmt='json'):
+    """Writes records as JSON (including environment info) or as CSV (one row per timing sample)."""
+    if fmt == 'json':
+        with open(path, 'wt') as file:
+            json.dump({'environment': environment_info(), 'results': records}, file, indent=2)
+    elif fmt == 'csv':
+        with open(path, 'wt', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(RECORD_FIELDS + ('run', 'time'))
+            for record in records:
+                fields = [record.get(k) for k in RECORD_FIELDS]
+                for run_no, run_time in enumerate(record['runs'] or [None]):
+                    writer.writerow(fields + [run_no, run_time])
+    else:
+        raise ValueError("Unknown report format '{}', choose from: {}".format(fmt, ", ".join(REPORT_FORMATS)))
+
+
+def read_report(path) -> List[Record]:
+    """Reads the records of a report written by `write_report` (format is detected by the file extension)."""
+    if not path.endswith('.csv'):
+        with open(path, 'rt') as file:
+            return json.load(file)['results']
+
+    records = {}
+    with open(path, 'rt', newline='') as file:
+        for row in csv.DictReader(file):
+            key = tuple(row[k] for k in KEY_FIELDS)
+            if key not in records:
+                records[key] = {k: row[k] for k in KEY_FIELDS}
+                records[key].update({k: (row[k] if k in TEXT_FIELDS else float(row[k])) if row[k] else None
+                                     for k in TIMING_FIELDS + GRAPH_FIELDS})
+                records[key]['runs'] = []
+            if row['time']:
+                records[key]['runs'].append(float(row['time']))
+    return list(records.values())
+
+
+def _baseline_pairs(records: List[Record], baseline: List[Record]) -> List[Tuple[Record, Record]]:
+    baseline_by_key = {tuple(r[k] for k in KEY_FIELDS): r for r in baseline}
+    pairs = [(record, baseline_by_key.get(tuple(record[k] for k in KEY_FIELDS))) for record in records]
+    return [(record, base) for record, base in pairs if base]
+
+
+def storage_mismatches(records: List[Record], baseline: List[Record]) -> List[Tuple[Record, Record]]:
+    """Finds records whose graph has been stored differently than in the baseline (their timings are not comparable).
+
+    Returns:
+        List of (record, baseline record) for all mismatches.
+    """
+    return [(record, base) for record, base in _baseline_pairs(records, baseline)
+            if record.get('storage') != base.get('storage')]
+
+
+def compare(records: List[Record], baseline: List[Record], threshold=0.1) -> List[Tuple[Record, Record, float]]:
+    """Finds regressions, i.e. records whose average time is more than threshold (relative) above the baseline.
+    Records that `storage_mismatches` finds are skipped.
+
+    Returns:
+        List of (record, baseline record, ratio) for all regressions.
+    """
+    regressions = []
+    for record, base in _baseline_pairs(records, baseline):
+        if record.get('storage') == base.get('storage') and base['avg']:
+            ratio = record['avg'] / base['avg']
+            if ratio > 1 + threshold:
+                regressions.append((record, base, ratio))
+    return regressions
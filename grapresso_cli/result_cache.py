@@ -0,0 +1,165 @@
+""" Memoization of deterministic algorithm results.
+
+Results are keyed by a content hash of the graph (independent of the backend that stores it) plus the method and
+its arguments. They are kept in an in-memory LRU and optionally in an on-disk store, which evicts the least
+recently used entries once it exceeds its size limit.
+"""
+
+import hashlib
+import os
+import pickle
+import struct
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Tuple
+
+from grapresso.components.graph import UnDiGraph
+
+RESULT_EXT = '.pickle'
+_FLOATS = struct.Struct('=dd')
+_PRIMITIVES = (int, float, str, bool, bytes, type(None))
+
+
+def graph_hash(graph) -> str:
+    """Content hash of a graph: Its directedness, nodes (with balances) and edges (with costs and capacities).
+    Edges are hashed in the backend's order, since algorithms may break ties by that order.
+    """
+    content = [b'U' if isinstance(graph, UnDiGraph) else b'D']
+    for node in graph.backend:
+        content.append(repr(node.name).encode())
+        content.append(_FLOATS.pack(node.balance, 0.0))
+        for edge in node.edges:
+            content.append(repr(edge.to_node.name).encode())
+            content.append(_FLOATS.pack(edge.cost, edge.capacity))
+    return hashlib.blake2b(b'\0'.join(content), digest_size=16).hexdigest()
+
+
+def result_key(content_hash, method, *args) -> str:
+    return hashlib.blake2b(repr((content_hash, method, args)).encode(), digest_size=16).hexdigest()
+
+
+def persistable(result) -> bool:
+    """Whether result consists of primitives only. Others (e.g. tours) reference graph components and
+    would drag the whole graph along, so these are kept in memory only.
+    """
+    if isinstance(result, _PRIMITIVES):
+        return True
+    if isinstance(result, (tuple, list)):
+        return all(persistable(item) for item in result)
+    if isinstance(result, dict):
+        return all(persistable(key) and persistable(value) for key, value in result.items())
+    return False
+
+
+class ResultCache:
+    """In-memory LRU of results with an optional on-disk store.
+
+    Args:
+        max_entries: Number of results kept in memory.
+        cache_dir: Directory of the on-disk store (None for memory only).
+        max_disk_size: Size limit of the on-disk store in bytes.
+    """
+
+    def __init__(self, max_entries=128, cache_dir=None, max_disk_size=256 * 1024 ** 2):
+        self._memory = OrderedDict()
+        self._graph_keys = defaultdict(set)
+        self._lock = threading.RLock()  # Guards the in-memory entries, the cache may be shared by threads
+        self._max_entries = max_entries
+        self._cache_dir = cache_dir
+        self._max_disk_size = max_disk_size
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self._cache_dir, key + RESULT_EXT)
+
+    def get(self, key) -> Tuple[bool, Any]:
+        """Returns:
+            Whether the key was found and the cached result.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return True, self._memory[key]
+        if self._cache_dir:
+            try:
+                with open(self._path(key), 'rb') as file:
+                    result = pickle.load(file)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                os.utime(self._path(key))  # Mark as recently used for the eviction
+                with self._lock:
+                    self._remember(key, result)
+                    self.hits += 1
+                return True, result
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def put(self, key, result, content_hash=None):
+        """Stores result, content_hash allows to `invalidate` it later on."""
+        with self._lock:
+            if content_hash is not None:
+                self._graph_keys[content_hash].add(key)
+            self._remember(key, result)
+        if not self._cache_dir or not persistable(result):
+            return
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self._max_disk_size:
+            return
+        os.makedirs(self._cache_dir, exist_ok=True)
+        tmp_path = "{}.{}.{}.tmp".format(self._path(key), os.getpid(), threading.get_ident())
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def call(self, content_hash, method, fn: callable, *args) -> Tuple[bool, Any]:
+        """Looks up the result of method(*args) on the graph with content_hash, calls fn(*args) on a miss.
+
+        Returns:
+            Whether the result was cached and the result.
+        """
+        key = result_key(content_hash, method, *args)
+        hit, result = self.get(key)
+        if not hit:
+            result = fn(*args)
+            self.put(key, result, content_hash)
+        return hit, result
+
+    def invalidate(self, content_hash) -> int:
+        """Drops the results stored for the graph with content_hash from memory, e.g. after it has been modified.
+        On-disk results stay, they are only found again if a graph with exactly that content is loaded.
+
+        Returns:
+            Number of dropped results.
+        """
+        with self._lock:
+            keys = self._graph_keys.pop(content_hash, ())
+            for key in keys:
+                self._memory.pop(key, None)
+        return len(keys)
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self._cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(RESULT_EXT):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._max_disk_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
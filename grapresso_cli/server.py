@@ -0,0 +1,282 @@
+""" Long-running graph server of the CLI (`mmi_cli.py serve`).
+
+Imported graphs stay resident in named slots, so requests do not pay for the interpreter startup, imports and the
+graph import again. Requests and responses are JSON objects, one per line, read from stdin (responses go to stdout,
+the CLI's output to stderr) or from the connections of a Unix socket (`--socket`):
+
+- `{"id": 1, "cmd": "load", "slot": "g", "file": "G_100_200.mmiw", "backend": "mem", "symmetric": true}`
+- `{"id": 2, "cmd": "run", "slot": "g", "methods": ["5*prim", "dijkstra"], "start": 0}`
+- `{"id": 3, "cmd": "apply", "slot": "g", "delta": "changes.delta"}`
+- `{"id": 4, "cmd": "unload", "slot": "g"}`, `{"cmd": "slots"}` and `{"cmd": "shutdown"}`
+
+Graphs are loaded into backends that deltas can be applied to (see `mmi_cli.MUTABLE_BACKEND_DISPATCH`).
+`load` and `run` accept further CLI options as "options", e.g. `["--warmup", "2"]` or `["--results-only"]`.
+A `run` answers with the same results[file][backend][method] structure as `mmi_cli.run`.
+Every response echoes the request's "id" and has "ok" set (and an "error" message if it is false).
+
+Requests are handled by a pool of worker threads (`--workers`): Requests against the same slot run one after another
+(in the order they were received), those against different slots concurrently if there is more than one worker.
+The methods are CPU-bound and serialized by the GIL, so concurrent requests slow down each other's timings: Timing
+requests should only be sent to a server with the default single worker, more workers pay off for e.g. loading graphs
+and `--results-only` requests. `--no-gc` is refused by servers with more than one worker, since the garbage collector
+is process-global.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Any, Dict, Callable, Iterable, TextIO
+
+from grapresso_cli import mmi_cli as cli, result_cache
+from grapresso_cli.importer.mmi_importer import MmiImporter
+
+SERVE_COMMAND = 'serve'
+
+Slot = NamedTuple('Slot', [('file_name', str), ('backend', str), ('symmetric', bool), ('graph', Any),
+                           ('graph_info', Dict[str, Any])])
+
+parser = argparse.ArgumentParser(prog='mmi_cli.py ' + SERVE_COMMAND,
+                                 description='Keep MMI graphs resident and process JSON-lines requests.')
+parser.add_argument('--socket', type=str, default=None,
+                    help="Listen on this Unix socket instead of reading requests from stdin.")
+parser.add_argument('--workers', type=int, default=1,
+                    help="Number of worker threads that handle requests against different slots concurrently "
+                         "(their timings affect each other, see the module documentation).")
+parser.add_argument('--base-dir', type=str, default=cli.parser.get_default('base_dir'))
+parser.add_argument('--cache', action='store_const', const=True, default=False,
+                    help="Load graphs from the compiled binary cache (see mmi_cli.py --cache).")
+parser.add_argument('--cache-dir', type=str, default=None,
+                    help="Alternative directory for the compiled graph cache.")
+
+
+class RequestError(ValueError):
+    pass
+
+
+class GraphServer:
+    """Graph slots and the worker pool that handles requests against them.
+
+    Args:
+        base_dir: Directory that file paths are relative to.
+        use_cache: Load graphs from the compiled binary cache.
+        cache_dir: Alternative directory for the compiled graph cache.
+        workers: Number of worker threads.
+    """
+
+    def __init__(self, base_dir, use_cache=False, cache_dir=None, workers=1):
+        self._base_dir = base_dir
+        self._importer = MmiImporter(base_dir, use_cache, cache_dir)
+        self._slots = {}
+        # Requests per slot that wait to be handled, a slot is only present while its requests are being handled:
+        self._queues = {}
+        self._queues_lock = threading.Lock()
+        self._idle = threading.Condition(self._queues_lock)
+        self._pending = 0
+        self._workers = workers
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='graph-server')
+
+    def _arguments(self, file_name, backend, symmetric=False, methods=(), options=()):
+        # Requests are turned into CLI arguments, so that they are validated and handled exactly like by `run`:
+        arguments = [file_name, '--backends', backend, '--base-dir', self._base_dir] + list(options)
+        if symmetric:
+            arguments.append('--symmetric')
+        if methods:
+            arguments += ['--methods'] + list(methods)
+        try:
+            return cli.parser.parse_args(arguments)
+        except SystemExit:
+            raise RequestError("Invalid arguments: {}".format(" ".join(arguments))) from None
+
+    def _slot(self, name) -> Slot:
+        try:
+            return self._slots[name]
+        except KeyError:
+            raise RequestError("There is no graph in slot '{}'.".format(name)) from None
+
+    def _release(self, slot: Slot):
+        cli.release_graph(slot.backend, slot.graph, slot.graph_info)
+
+    def load(self, slot, file, backend='mem', symmetric=False, options=()):
+        passed_values = self._arguments(file, backend, symmetric, options=options)
+        graph, graph_info = cli.import_cell(passed_values, self._importer, file, backend, mutable=True)
+        if slot in self._slots:
+            self._release(self._slots[slot])
+        self._slots[slot] = Slot(file, backend, symmetric, graph, graph_info)
+        return {'graph': graph_info}
+
+    def run(self, slot, methods, start=None, options=()):
+        slot = self._slot(slot)
+        if start is not None:
+            options = list(options) + ['--start', str(start)]
+        passed_values = self._arguments(slot.file_name, slot.backend, slot.symmetric, methods, options)
+        if passed_values.no_gc and self._workers > 1:
+            # Concurrent requests would enable and disable the (process-global) garbage collector for each other:
+            raise RequestError("--no-gc is not supported by servers with more than one worker.")
+        if cli.get_result_cache(passed_values) and 'content_hash' not in slot.graph_info \
+                and slot.backend != cli.STREAM_BACKEND:
+            # The graph has been loaded without a result cache:
+            slot.graph_info['content_hash'] = result_cache.graph_hash(slot.graph)
+        cell_results = {}
+        for n_method in passed_values.methods:
+            method, timeit_result = cli.run_method(passed_values, self._importer, slot.file_name, slot.backend,
+                                                   slot.graph, slot.graph_info, n_method)
+            cell_results[method] = cli.sendable(timeit_result)
+        return {'results': {slot.file_name: {slot.backend: cell_results}}}
+
+    def apply(self, slot, delta, options=()):
+        name, slot = slot, self._slot(slot)
+        if slot.backend in (cli.STREAM_BACKEND, cli.SHARED_BACKEND):
+            raise RequestError("Deltas are not supported by the '{}' backend.".format(slot.backend))
+        passed_values = self._arguments(slot.file_name, slot.backend, slot.symmetric, options=options)
+        graph_info = cli.apply_delta(passed_values, self._importer, slot.graph, slot.graph_info, delta)
+        self._slots[name] = slot._replace(graph_info=graph_info)
+        return {'graph': graph_info}
+
+    def unload(self, slot):
+        self._release(self._slot(slot))
+        del self._slots[slot]
+        return {}
+
+    def slots(self):
+        return {'slots': {name: {'file': slot.file_name, 'backend': slot.backend, 'graph': slot.graph_info}
+                          for name, slot in list(self._slots.items())}}
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Handles a single request (see the module documentation) in the calling thread.
+        Unlike `submit`, this does not keep requests against the same slot from running concurrently.
+
+        Returns:
+            The response.
+        """
+        response = {'id': request.get('id'), 'ok': True}
+        try:
+            command = request.get('cmd')
+            if command not in ('load', 'run', 'apply', 'unload', 'slots'):
+                raise RequestError("Unknown command '{}'.".format(command))
+            arguments = {k: v for k, v in request.items() if k not in ('id', 'cmd')}
+            if command == 'slots':
+                response.update(self.slots(**arguments))
+            else:
+                if 'slot' not in arguments:
+                    raise RequestError("Missing 'slot'.")
+                response.update(getattr(self, command)(**arguments))
+        except Exception as e:  # The server keeps running, no matter what a single request does
+            response.update(ok=False, error="{}: {}".format(type(e).__name__, e))
+        return response
+
+    def submit(self, request: Dict[str, Any], respond: Callable[[Dict[str, Any]], None]):
+        """Handles a request in the worker pool and passes the response to respond (from the worker thread)."""
+        slot = request.get('slot')
+        with self._queues_lock:
+            self._pending += 1
+            if not isinstance(slot, str):
+                slot = None  # Not bound to a slot, handled on its own
+            elif slot in self._queues:
+                self._queues[slot].append((request, respond))  # Handled by the task that is active for the slot
+                return
+            else:
+                self._queues[slot] = deque([(request, respond)])
+        if slot is None:
+            self._executor.submit(self._respond, request, respond)
+        else:
+            self._executor.submit(self._handle_queue, slot)
+
+    def _handle_queue(self, slot):
+        while True:
+            with self._queues_lock:
+                queue = self._queues[slot]
+                if not queue:
+                    del self._queues[slot]
+                    return
+                request, respond = queue.popleft()
+            self._respond(request, respond)
+
+    def _respond(self, request, respond):
+        try:
+            respond(self.handle(request))
+        finally:
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    def wait(self):
+        """Waits until all submitted requests have been handled."""
+        with self._idle:
+            self._idle.wait_for(lambda: self._pending == 0)
+
+    def close(self):
+        self._executor.shutdown()
+        for slot in self._slots.values():
+            self._release(slot)
+        self._slots.clear()
+
+
+def serve_lines(server: GraphServer, lines: Iterable[str], output: TextIO):
+    """Handles the JSON-lines requests of lines until a shutdown request or the end of lines,
+    responses are written to output (in the order in which they are finished).
+    """
+    output_lock = threading.Lock()
+
+    def respond(response):
+        with output_lock:
+            output.write(json.dumps(response) + "\n")
+            output.flush()
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Requests must be JSON objects.")
+        except ValueError as e:
+            respond({'id': None, 'ok': False, 'error': "Malformed request: {}".format(e)})
+            continue
+        if request.get('cmd') == 'shutdown':
+            server.wait()
+            respond({'id': request.get('id'), 'ok': True})
+            return True
+        server.submit(request, respond)
+    server.wait()
+    return False
+
+
+def serve_socket(server: GraphServer, path):
+    """Handles the JSON-lines requests of every connection to the Unix socket at path until a shutdown request."""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            output = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+            if serve_lines(server, io.TextIOWrapper(self.rfile, encoding='utf-8'), output):
+                threading.Thread(target=unix_server.shutdown).start()
+
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as unix_server:
+        try:
+            unix_server.serve_forever()
+        finally:
+            os.remove(path)
+
+
+def main(arguments):
+    passed_values = parser.parse_args(arguments)
+    server = GraphServer(passed_values.base_dir, passed_values.cache, passed_values.cache_dir, passed_values.workers)
+    try:
+        if passed_values.socket:
+            print("Serving on '{}'...".format(passed_values.socket), flush=True)
+            serve_socket(server, passed_values.socket)
+        else:
+            # Responses are written to stdout, so the CLI's output goes to stderr instead:
+            output = sys.stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                serve_lines(server, sys.stdin, output)
+    finally:
+        server.close()
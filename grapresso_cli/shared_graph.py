@@ -0,0 +1,177 @@
+""" Graph snapshots in shared memory, so that several processes can work on one imported graph without copying it.
+
+The snapshot holds the graph in CSR form (see `CsrView`):
+- Header: node count, number of CSR entries (symmetric edges count twice) and whether the graph is directed
+- offsets (int64[n + 1]), targets (int64[m]), costs (double[m]), capacities (double[m]), balances (double[n])
+
+The exporting process owns the shared memory block and unlinks it when its graph view is closed.
+Other processes `attach` to the block by name and get a read-only graph view backed by the shared memory.
+"""
+
+import multiprocessing
+import struct
+import sys
+from array import array
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from grapresso.components.graph import DiGraph, UnDiGraph
+from grapresso_cli.backends.csr import CsrView
+from grapresso_cli.importer.mmi_importer import MmiData
+
+HEADER = struct.Struct('=qq?7x')
+
+# Names of the blocks created by this process (their resource tracker registration must be kept):
+_exported = set()
+
+
+def snapshot_size(node_count, entry_count) -> int:
+    """Size of a snapshot in bytes."""
+    return HEADER.size + 8 * (2 * node_count + 1 + 3 * entry_count)
+
+
+def column_views(buffer):
+    """Typed views of the columns (offsets, targets, costs, capacities, balances) of the snapshot in buffer.
+
+    Returns:
+        Whether the graph is directed and the views (release them when done).
+    """
+    node_count, entry_count, is_directed = HEADER.unpack_from(buffer)
+    views = []
+    offset = HEADER.size
+    buffer = memoryview(buffer)
+    for fmt, count in (('q', node_count + 1), ('q', entry_count), ('d', entry_count), ('d', entry_count),
+                       ('d', node_count)):
+        views.append(buffer[offset:offset + count * 8].cast(fmt))
+        offset += count * 8
+    buffer.release()
+    return is_directed, views
+
+
+class BufferCsrView(CsrView):
+    """CSR view over a snapshot in a buffer (e.g. shared memory or a memory-mapped file)."""
+
+    def __init__(self, buffer):
+        self.is_directed, self._views = column_views(buffer)
+        super().__init__(*self._views)
+
+    def graph(self):
+        return DiGraph(self) if self.is_directed else UnDiGraph(self)
+
+    def _release_views(self):
+        self.offsets = self.targets = self.costs = self.capacities = self.balances = self._lookup = None
+        for view in self._views:
+            view.release()
+        self._views = []
+
+
+class SharedCsrView(BufferCsrView):
+    """CSR view over a shared memory block."""
+
+    def __init__(self, shm: SharedMemory, owner=False):
+        self._shm = shm
+        self._owner = owner
+        super().__init__(shm.buf)
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block, used by other processes to `attach`."""
+        return self._shm.name
+
+    def close(self):
+        """Releases the shared memory (and destroys it if this process created it)."""
+        self._release_views()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+            _exported.discard(self._shm.name)
+
+
+def _export(columns, is_directed):
+    offsets, targets, costs, capacities, balances = columns
+    shm = SharedMemory(create=True, size=snapshot_size(len(balances), len(targets)))
+    _exported.add(shm.name)
+    HEADER.pack_into(shm.buf, 0, len(offsets) - 1, len(targets), is_directed)
+    offset = HEADER.size
+    for column in columns:
+        size = len(column) * 8
+        shm.buf[offset:offset + size] = memoryview(column).cast('B')
+        offset += size
+    return SharedCsrView(shm, owner=True).graph()
+
+
+def graph_columns(graph):
+    """CSR columns (see `CsrView`) of an imported graph with the node names 0..n-1."""
+    backend = graph.backend
+    if set(backend.node_names()) != set(range(len(backend))):
+        raise ValueError("Only graphs with the node names 0..n-1 (e.g. imported MMI graphs) can be exported.")
+
+    offsets, targets, costs, capacities = array('q', [0]), array('q'), array('d'), array('d')
+    for i in range(len(backend)):
+        for edge in backend[i].edges:
+            targets.append(edge.to_node.name)
+            costs.append(edge.cost)
+            capacities.append(edge.capacity)
+        offsets.append(len(targets))
+    balances = array('d', (backend[i].balance for i in range(len(backend))))
+    return offsets, targets, costs, capacities, balances
+
+
+def export_graph(graph):
+    """Exports an imported graph (with the node names 0..n-1) into a new shared memory block.
+
+    Returns:
+        A read-only view of the exported graph, its backend's `name` identifies the block.
+    """
+    return _export(graph_columns(graph), not isinstance(graph, UnDiGraph))
+
+
+def export_mmi_data(data: MmiData, is_directed=False):
+    """Exports parsed MMI data into a new shared memory block without building an intermediate graph.
+    The edges of every node keep the order of the file (like when importing them into a graph).
+
+    Returns:
+        A read-only view of the exported graph, its backend's `name` identifies the block.
+    """
+    node_count, edge_count = data.node_count, len(data.sources)
+    entry_count = edge_count if is_directed else 2 * edge_count
+    costs = data.costs if data.meta_info.weighted else array('d', [0.0]) * edge_count
+    capacities = data.capacities if data.meta_info.capacity else array('d', [0.0]) * edge_count
+
+    # Counting sort of the CSR entries by their from-node:
+    offsets = array('q', [0]) * (node_count + 1)
+    for u in data.sources:
+        offsets[u + 1] += 1
+    if not is_directed:
+        for v in data.targets:
+            offsets[v + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+
+    positions = array('q', offsets)
+    csr_targets, csr_costs, csr_capacities = array('q', [0]) * entry_count, array('d', [0.0]) * entry_count, \
+        array('d', [0.0]) * entry_count
+    for u, v, cost, capacity in zip(data.sources, data.targets, costs, capacities):
+        for a, b in ((u, v),) if is_directed else ((u, v), (v, u)):
+            pos = positions[a]
+            csr_targets[pos], csr_costs[pos], csr_capacities[pos] = b, cost, capacity
+            positions[a] = pos + 1
+
+    balances = data.balances if data.meta_info.balanced else array('d', [0.0]) * node_count
+    return _export((offsets, csr_targets, csr_costs, csr_capacities, balances), is_directed)
+
+
+def attach(name):
+    """Attaches to a shared graph by name.
+
+    Returns:
+        A read-only graph view, close its backend when done.
+    """
+    if sys.version_info >= (3, 13):
+        shm = SharedMemory(name=name, track=False)
+    else:
+        shm = SharedMemory(name=name)
+        if multiprocessing.parent_process() is None and name not in _exported:
+            # Unrelated processes have their own resource tracker that would destroy the block on exit (bpo-38119):
+            resource_tracker.unregister(shm._name, 'shared_memory')
+    return SharedCsrView(shm).graph()
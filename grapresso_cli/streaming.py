@@ -0,0 +1,123 @@
+""" Algorithms that consume the importer's edge stream directly instead of a fully built graph.
+This allows processing edge lists that would not fit into memory when using a graph backend.
+"""
+
+import heapq
+import struct
+import tempfile
+from array import array
+from itertools import islice
+from typing import Iterator, Tuple
+
+from grapresso_cli.importer.mmi_importer import MmiImporter
+
+# Edges sorted in memory at once, larger edge lists are sorted in runs of this size that are merged from disk:
+SORT_RUN_SIZE = 1 << 18
+RUN_RECORD = struct.Struct('<dqq')  # cost, from node, to node
+RUN_READ_RECORDS = 4096
+
+
+class ArrayDisjointSet:
+    """Disjoint set over the node ids 0..n-1 using flat typed arrays, path halving and union by size."""
+
+    def __init__(self, size: int):
+        self._parents = array('q', range(size))
+        self._sizes = array('q', [1]) * size
+        self.count = size
+
+    def find(self, x: int) -> int:
+        parents = self._parents
+        while parents[x] != x:
+            parents[x] = parents[parents[x]]
+            x = parents[x]
+        return x
+
+    def union(self, x: int, y: int) -> bool:
+        """Unites the sets of x and y.
+
+        Returns:
+            False if x and y already were in the same set, else True.
+        """
+        x_root, y_root = self.find(x), self.find(y)
+        if x_root == y_root:
+            return False
+        if self._sizes[x_root] < self._sizes[y_root]:
+            x_root, y_root = y_root, x_root
+        self._parents[y_root] = x_root
+        self._sizes[x_root] += self._sizes[y_root]
+        self.count -= 1
+        return True
+
+
+def count_connected_components(importer: MmiImporter, file_path) -> int:
+    """Counts connected components in a single pass over the edges (O(n) memory)."""
+    node_count, _ = importer.read_header(file_path)
+    dj_set = ArrayDisjointSet(node_count)
+    for u, v, _, _ in importer.iter_edges(file_path):
+        dj_set.union(u, v)
+    return dj_set.count
+
+
+def perform_kruskal(importer: MmiImporter, file_path) -> float:
+    """Computes the weight of a minimum spanning tree (forest) with Kruskal's algorithm.
+    The edges are sorted by an external merge sort (see `sorted_edges`), so memory stays O(n) plus one sorted run.
+    """
+    node_count, _ = importer.read_header(file_path)
+    dj_set = ArrayDisjointSet(node_count)
+    mst_costs = 0
+    edges = sorted_edges(importer.iter_edges(file_path))
+    try:
+        for cost, u, v in edges:
+            if dj_set.union(u, v):
+                mst_costs += cost
+                if dj_set.count == 1:
+                    break
+    finally:
+        edges.close()
+    return mst_costs
+
+
+def sorted_edges(edges, run_size=None, directory=None) -> Iterator[Tuple[float, int, int]]:
+    """Sorts (from_node, to_node, cost, capacity) edges by cost and yields them as (cost, from_node, to_node).
+
+    Runs of up to run_size edges are held as compact columns (no edge objects) and sorted in memory. If there is more
+    than one run, each is written to a temporary file (in directory) and the runs are merged, reading them in chunks.
+
+    Args:
+        run_size: Number of edges sorted in memory at once, defaults to `SORT_RUN_SIZE`.
+    """
+    run_size = run_size or SORT_RUN_SIZE
+    edges = iter(edges)
+    runs = []
+    try:
+        while True:
+            sources, targets, costs = array('q'), array('q'), array('d')
+            for u, v, cost, _ in islice(edges, run_size):
+                sources.append(u)
+                targets.append(v)
+                costs.append(cost)
+            order = sorted(range(len(costs)), key=costs.__getitem__)
+            if not runs and len(costs) < run_size:
+                # All edges fit into one run, no need to go to disk:
+                for i in order:
+                    yield costs[i], sources[i], targets[i]
+                return
+            if costs:
+                run = tempfile.TemporaryFile(dir=directory)
+                runs.append(run)
+                run.write(b''.join(RUN_RECORD.pack(costs[i], sources[i], targets[i]) for i in order))
+            if len(costs) < run_size:
+                break
+        yield from heapq.merge(*(_read_run(run) for run in runs))
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _read_run(run) -> Iterator[Tuple[float, int, int]]:
+    run.seek(0)
+    while True:
+        chunk = run.read(RUN_RECORD.size * RUN_READ_RECORDS)
+        if not chunk:
+            return
+        yield from RUN_RECORD.iter_unpack(chunk)
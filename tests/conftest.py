@@ -2,9 +2,11 @@ import pytest
 
 from grapresso.backends.memory import InMemoryBackend, Trait
 from grapresso.backends.networkx import NetworkXBackend
+from grapresso_cli.backends.csr import CsrBackend
+from grapresso_cli.backends.memory import MemoryBackend
 from grapresso_cli.importer.mmi_importer import MmiImporter
 
-ALL_BACKENDS = ('InMemory-OptimizeMemory', 'InMemory-OptimizePerformance', 'NetworkXBackend')
+ALL_BACKENDS = ('InMemory-OptimizeMemory', 'InMemory-OptimizePerformance', 'NetworkXBackend', 'CsrBackend')
 ENABLED_BACKENDS = ALL_BACKENDS
 
 
@@ -15,19 +17,26 @@ def create_backend(request, tmp_path):
             'InMemory-OptimizeMemory': InMemoryBackend(Trait.OPTIMIZE_MEMORY),
             'InMemory-OptimizePerformance': InMemoryBackend(Trait.OPTIMIZE_PERFORMANCE),
             'NetworkXBackend': NetworkXBackend(),
+            'CsrBackend': CsrBackend(),
         }[request.param]
 
     return _create_backend
 
 
-@pytest.fixture
-def importer():
-    return MmiImporter("../grapresso_cli/res/example-graphs/")
+@pytest.fixture(params=ENABLED_BACKENDS)
+def create_mutable_backend(request):
+    """Like `create_backend`, but edges can be removed from the in-memory backends (for deltas)."""
+    def _create_backend():
+        return {
+            'InMemory-OptimizeMemory': MemoryBackend(Trait.OPTIMIZE_MEMORY),
+            'InMemory-OptimizePerformance': MemoryBackend(Trait.OPTIMIZE_PERFORMANCE),
+            'NetworkXBackend': NetworkXBackend(),
+            'CsrBackend': CsrBackend(),
+        }[request.param]
 
+    return _create_backend
 
-@pytest.fixture
-def create_graph(importer, create_backend):
-    def _graph(name, directed=False):
-        return importer.read_graph(create_backend(), name, directed)
 
-    return _graph
+@pytest.fixture
+def importer():
+    return MmiImporter("../grapresso_cli/res/example-graphs/")
@@ -1,11 +1,13 @@
 # The following has essentially been adapted from https://pypi.org/project/pytest-memprof/0.2.0
 
-import threading
-
-import psutil
-# import pandas
 import pytest
 import time
+from collections import defaultdict
+
+from grapresso_cli import report
+from grapresso_cli.importer.mmi_importer import build_graph
+from tests.perf import memprof
+from tests.perf.generators import fit_exponent
 
 
 def pytest_addoption(parser):
@@ -18,55 +20,157 @@ def pytest_addoption(parser):
         help='limit memory reports to top n entries, report all if value is 0',
     )
 
-    # group.addoption(
-    #     '--profiling-csv-file',
-    #     action='store',
-    #     dest='csv_file',
-    #     default=None,
-    #     help='Output comma separated value table to given filename',
-    # )
+    group.addoption(
+        '--memprof-mode',
+        action='store',
+        dest='memprof_mode',
+        choices=memprof.MODES,
+        default='rss',
+        help='rss: high-water mark of the process RSS (default), '
+             'tracemalloc: exact peak of Python allocations (slower), '
+             'system: system-wide used memory (legacy, noisy)',
+    )
+    group.addoption(
+        '--memprof-interval',
+        action='store',
+        dest='memprof_interval',
+        type=float,
+        default=0.01,
+        help='sampling interval in seconds of the rss and system modes',
+    )
+    group.addoption(
+        '--perf-report',
+        action='store',
+        dest='perf_report',
+        nargs=2,
+        metavar=('{json,csv}', 'PATH'),
+        default=None,
+        help='write time/memory of every test and environment info to a json or csv report',
+    )
+    group.addoption(
+        '--perf-compare',
+        action='store',
+        dest='perf_compare',
+        metavar='BASELINE',
+        default=None,
+        help='compare against a baseline report and fail if a test regressed',
+    )
+    group.addoption(
+        '--perf-compare-threshold',
+        action='store',
+        dest='perf_compare_threshold',
+        type=float,
+        default=0.1,
+        help='relative slowdown that is tolerated by --perf-compare',
+    )
+
+    group = parser.getgroup('scaling')
+    group.addoption(
+        '--scaling-sizes',
+        action='store',
+        dest='scaling_sizes',
+        default='1000,2000,4000',
+        help='comma separated edge counts of the graphs generated by the scaling suite (e.g. 1e3,1e4,1e5,1e6)',
+    )
+    group.addoption(
+        '--scaling-max-exponent',
+        action='store',
+        dest='scaling_max_exponent',
+        type=float,
+        default=None,
+        help='fail if the time of an algorithm grows faster than edges^exponent',
+    )
 
     parser.addini('memprof_top_n', 'limit memory reports to top n entries')
-    # parser.addini('memprof_csv_file', 'output comma separated value table to given filename')
 
 
 mem_consumptions = {}
+mem_phase_consumptions = {}
 time_consumptions = {}
+perf_records = []
+perf_regressions = []
+# (algorithm, graph type, backend) -> [(edges, seconds, memory increase)]
+scaling_records = defaultdict(list)
+scaling_violations = []
 
 
-@pytest.hookimpl(hookwrapper=True)
-def pytest_runtest_call(item):
-    def available_mem():
-        return psutil.virtual_memory().available
+def pytest_generate_tests(metafunc):
+    if 'scaling_size' in metafunc.fixturenames:
+        sizes = [int(float(size)) for size in metafunc.config.option.scaling_sizes.split(',')]
+        metafunc.parametrize('scaling_size', sizes, ids=["{}e".format(size) for size in sizes])
+
+
+@pytest.fixture
+def record_scaling(request):
+    """Records the run time of an algorithm on a generated graph with the given number of edges."""
+
+    def record(algorithm, graph_type, edge_count, seconds):
+        request.node.scaling_record = (algorithm, graph_type, edge_count, seconds)
+
+    return record
+
+
+@pytest.fixture(scope='session')
+def parsed_graphs():
+    """Parsed MMI files by name, so that every file is only read from disk once per session."""
+    return {}
+
 
-    before = available_mem()
+@pytest.fixture
+def create_graph(importer, create_backend, parsed_graphs):
+    """Builds a fresh graph (so mutating algorithms stay isolated) from the session's parsed data."""
 
-    peaks = []
-    running = threading.Event()
-    running.set()
+    def _graph(name, directed=False):
+        if name not in parsed_graphs:
+            with memprof.phase('parse'):
+                parsed_graphs[name] = importer.parse(name)
+        with memprof.phase('import'):
+            return build_graph(create_backend(), parsed_graphs[name], directed)
 
-    def report_mem():
-        peaks.append(available_mem())
-        if running.is_set():
-            # run this function in 0.1 seconds again:
-            threading.Timer(0.1, report_mem).start()
+    return _graph
 
-    report_mem()
+
+def pytest_configure(config):
+    memprof.profiler = memprof.create_profiler(config.option.memprof_mode, config.option.memprof_interval)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    memprof.profiler.start()
 
     start = time.time()
     yield
     end = time.time()
     duration = end - start
 
-    running.clear()
+    increase, phase_increases = memprof.profiler.stop()
 
     key = "::".join(item.listnames()[2:])
+    mem_consumptions[key] = increase
+    mem_phase_consumptions[key] = phase_increases
+    time_consumptions[key] = duration
+
+    duration_ms = duration * 1000
+    method = item.cls.__name__ + "::" + item.originalname if item.cls else item.originalname
+    perf_records.append({'file': item.fspath.basename,
+                         'backend': item.callspec.id if hasattr(item, 'callspec') else '',
+                         'method': method,
+                         'avg': duration_ms, 'fastest': duration_ms, 'slowest': duration_ms,
+                         'peak_memory': increase, 'runs': [duration_ms]})
 
-    after = min(peaks + [available_mem()])
-    increase = before - after
-    if increase > 0:
-        mem_consumptions[key] = increase
-        time_consumptions[key] = duration
+    if hasattr(item, 'scaling_record'):
+        algorithm, graph_type, edge_count, seconds = item.scaling_record
+        memory = phase_increases.get(memprof.DEFAULT_PHASE, increase)
+        scaling_records[algorithm, graph_type, item.callspec.params['create_backend']].append(
+            (edge_count, seconds, memory))
+
+
+def scaling_exponents(records):
+    """Fitted growth exponents of (time, memory) in the number of edges."""
+    records = sorted(records)
+    sizes = [edges for edges, _, _ in records]
+    return (fit_exponent(sizes, [seconds for _, seconds, _ in records]),
+            fit_exponent(sizes, [memory for _, _, memory in records]))
 
 
 def fmt_mem(mem):
@@ -84,12 +188,30 @@ def fmt_duration(duration):
     return "%.2fs" % duration
 
 
+def pytest_sessionfinish(session, exitstatus):
+    option = session.config.option
+    if option.perf_report:
+        report_format, report_path = option.perf_report
+        report.write_report(perf_records, report_path, report_format)
+    if option.perf_compare:
+        perf_regressions.extend(report.compare(perf_records, report.read_report(option.perf_compare),
+                                               option.perf_compare_threshold))
+        if perf_regressions:
+            session.exitstatus = 1
+    if option.scaling_max_exponent is not None:
+        for key, records in scaling_records.items():
+            time_exponent, _ = scaling_exponents(records)
+            if time_exponent > option.scaling_max_exponent:
+                scaling_violations.append((key, time_exponent))
+        if scaling_violations:
+            session.exitstatus = 1
+
+
 @pytest.hookimpl(hookwrapper=True)
 def pytest_terminal_summary(terminalreporter, exitstatus):
     tr = terminalreporter
 
     top_n = tr.config.option.memprof_top_n
-    # csv_filename = tr.config.option.memprof_csv_file
 
     try:
         top_n = int(top_n)
@@ -109,11 +231,30 @@ def pytest_terminal_summary(terminalreporter, exitstatus):
             tr.write((name + filler)[:numc] + " - ")
             tr.write(fmt_duration(value), bold=True)
             tr.write(" / ")
-            tr.write(fmt_mem(mem_consumptions[name]) + "\n", bold=True)
+            tr.write(fmt_mem(mem_consumptions[name]), bold=True)
+            phases = mem_phase_consumptions[name]
+            if len(phases) > 1:
+                tr.write(" (" + " | ".join(p + " " + fmt_mem(m) for p, m in sorted(phases.items())) + ")")
+            tr.write("\n")
+
+    if tr.config.option.perf_compare:
+        tr.section("performance comparison")
+        for record, base, ratio in perf_regressions:
+            tr.write("{method}[{backend}] - ".format(**record))
+            tr.write("regressed x{} ({} ms vs. {} ms)\n".format(round(ratio, 3), round(record['avg'], 3),
+                                                                round(base['avg'], 3)), bold=True, red=True)
+        if not perf_regressions:
+            tr.write("No regressions compared to '{}'.\n".format(tr.config.option.perf_compare), green=True)
 
-        # if csv_filename:
-        #     with open(csv_filename, 'wt') as csvfile:
-        #         writer = csv.writer(csvfile)
-        #         writer.writerow(['function', 'memory'])
-        #         writer.writerows(items)
+    if scaling_records:
+        tr.section("scaling")
+        for (algorithm, graph_type, backend), records in sorted(scaling_records.items()):
+            time_exponent, memory_exponent = scaling_exponents(records)
+            tr.write("{} on {} [{}] - ".format(algorithm, graph_type, backend))
+            tr.write("time ~ E^{:.2f}, memory ~ E^{:.2f}".format(time_exponent, memory_exponent), bold=True)
+            tr.write(" (" + " | ".join("{} edges: {:.2f} ms / {}".format(edges, seconds * 1000, fmt_mem(memory))
+                                       for edges, seconds, memory in sorted(records)) + ")\n")
+        for (algorithm, graph_type, backend), exponent in scaling_violations:
+            tr.write("{} on {} [{}] - time grows faster than allowed (E^{:.2f} > E^{})\n".format(
+                algorithm, graph_type, backend, exponent, tr.config.option.scaling_max_exponent), bold=True, red=True)
     yield
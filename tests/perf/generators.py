@@ -0,0 +1,166 @@
+""" Seeded generators of synthetic graphs for the scaling suite.
+
+Every generator takes the (approximate) number of edges and a seed and returns a `GeneratedGraph`, whose edges are
+produced lazily, so that they can be streamed straight into a backend (see `build`).
+"""
+
+import math
+import random
+from typing import NamedTuple, Iterator, Tuple, List, Callable
+
+from grapresso_cli.importer.mmi_importer import build_graph_from_edges
+
+Edge = Tuple[int, int, float, float]
+
+GeneratedGraph = NamedTuple('GeneratedGraph', [('node_count', int), ('edges', Iterator[Edge]),
+                                               ('balances', List[float]), ('directed', bool)])
+
+
+def _cost(rng):
+    return round(rng.uniform(1, 100), 2)
+
+
+def _integral_cost(rng):
+    # Flow algorithms add up costs along residual cycles, which must not become negative due to rounding errors:
+    return float(rng.randint(1, 100))
+
+
+def sparse(edge_count, seed=0) -> GeneratedGraph:
+    """Connected random graph with an average degree of 8: a random spanning tree plus random edges."""
+    rng = random.Random(seed)
+    node_count = max(2, edge_count // 4)
+
+    def edges():
+        seen = set()
+        for v in range(1, node_count):
+            u = rng.randrange(v)
+            seen.add(u * node_count + v)
+            yield u, v, _cost(rng), 0.0
+        for _ in range(edge_count - node_count + 1):
+            while True:
+                u, v = sorted(rng.sample(range(node_count), 2))
+                if u * node_count + v not in seen:
+                    break
+            seen.add(u * node_count + v)
+            yield u, v, _cost(rng), 0.0
+
+    return GeneratedGraph(node_count, edges(), [0.0] * node_count, False)
+
+
+def dense(edge_count, seed=0) -> GeneratedGraph:
+    """Connected random graph in which half of all possible edges exist (a path connects all nodes)."""
+    rng = random.Random(seed)
+    node_count = max(2, math.isqrt(4 * edge_count))
+
+    def edges():
+        for u in range(node_count):
+            for v in range(u + 1, node_count):
+                if v == u + 1 or rng.random() < 0.5:
+                    yield u, v, _cost(rng), 0.0
+
+    return GeneratedGraph(node_count, edges(), [0.0] * node_count, False)
+
+
+def complete(edge_count, seed=0) -> GeneratedGraph:
+    rng = random.Random(seed)
+    node_count = max(2, math.ceil((1 + math.sqrt(1 + 8 * edge_count)) / 2))
+
+    def edges():
+        for u in range(node_count):
+            for v in range(u + 1, node_count):
+                yield u, v, _cost(rng), 0.0
+
+    return GeneratedGraph(node_count, edges(), [0.0] * node_count, False)
+
+
+def grid(edge_count, seed=0) -> GeneratedGraph:
+    """Square grid graph (each node is connected to its right and lower neighbour)."""
+    rng = random.Random(seed)
+    side = max(2, math.ceil(math.sqrt(edge_count / 2)) + 1)
+
+    def edges():
+        for row in range(side):
+            for column in range(side):
+                node = row * side + column
+                if column + 1 < side:
+                    yield node, node + 1, _cost(rng), 0.0
+                if row + 1 < side:
+                    yield node, node + side, _cost(rng), 0.0
+
+    return GeneratedGraph(side * side, edges(), [0.0] * (side * side), False)
+
+
+def bipartite(edge_count, seed=0) -> GeneratedGraph:
+    """Unit capacity flow network of a random bipartite matching problem:
+    Source 0 -> left nodes -> (8 random) right nodes -> target (the last node).
+    """
+    rng = random.Random(seed)
+    degree = 8
+    side = max(1, edge_count // (degree + 2))
+    node_count = 2 * side + 2
+    target = node_count - 1
+
+    def edges():
+        for left in range(1, side + 1):
+            yield 0, left, 0.0, 1.0
+            for right in rng.sample(range(side + 1, 2 * side + 1), min(degree, side)):
+                yield left, right, 0.0, 1.0
+        for right in range(side + 1, 2 * side + 1):
+            yield right, target, 0.0, 1.0
+
+    return GeneratedGraph(node_count, edges(), [0.0] * node_count, True)
+
+
+def flow(edge_count, seed=0, supply=10.0) -> GeneratedGraph:
+    """Layered flow network from source 0 to target (the last node) with random costs and capacities.
+    Every node is connected to 3 random nodes of the next layer. A backbone path through the first node of every
+    layer has a capacity of at least supply, so a flow of supply (the source's balance) is always feasible.
+    """
+    rng = random.Random(seed)
+    degree = 3
+    width = max(degree, math.isqrt(edge_count // degree))
+    layers = max(1, edge_count // (degree * width))
+    node_count = layers * width + 2
+    target = node_count - 1
+
+    def edges():
+        for i in range(width):
+            yield 0, 1 + i, _integral_cost(rng), supply if i == 0 else float(rng.randint(1, 100))
+        for layer in range(layers - 1):
+            first, next_first = 1 + layer * width, 1 + (layer + 1) * width
+            for i in range(width):
+                targets = set(rng.sample(range(width), degree))
+                if i == 0:
+                    targets.add(0)
+                for j in sorted(targets):
+                    capacity = float(rng.randint(1, 100))
+                    if i == j == 0:
+                        capacity = max(capacity, supply)
+                    yield first + i, next_first + j, _integral_cost(rng), capacity
+        last = 1 + (layers - 1) * width
+        for i in range(width):
+            yield last + i, target, _integral_cost(rng), supply if i == 0 else float(rng.randint(1, 100))
+
+    balances = [0.0] * node_count
+    balances[0], balances[target] = supply, -supply
+    return GeneratedGraph(node_count, edges(), balances, True)
+
+
+GENERATORS = {'sparse': sparse, 'dense': dense, 'complete': complete, 'grid': grid,
+              'bipartite': bipartite, 'flow': flow}
+
+
+def build(backend, generator: Callable[..., GeneratedGraph], edge_count, seed=0):
+    """Streams a generated graph into backend."""
+    generated = generator(edge_count, seed)
+    return build_graph_from_edges(backend, generated.balances, generated.edges, generated.directed)
+
+
+def fit_exponent(sizes, values) -> float:
+    """Empirical growth exponent k of values ~ sizes^k (least squares fit in log-log space)."""
+    points = [(math.log(size), math.log(value)) for size, value in zip(sizes, values) if size > 0 and value > 0]
+    if len({x for x, _ in points}) < 2:
+        return math.nan
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / sum((x - mean_x) ** 2 for x, _ in points)
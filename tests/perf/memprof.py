@@ -0,0 +1,190 @@
+""" Memory profilers used by the memprof hooks of the perf plugin.
+
+All profilers measure the memory increase of a test (peak - start) and attribute it to phases.
+Code can mark a phase (e.g. the graph import) using `phase`. Everything outside of a marked phase is
+attributed to the DEFAULT_PHASE.
+"""
+
+import threading
+import time
+import tracemalloc
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+import psutil
+
+DEFAULT_PHASE = 'algorithm'
+MODES = ('rss', 'tracemalloc', 'system')
+
+# Profiler of the current session (set by the plugin), phases are only tracked if it is active:
+profiler = None
+
+
+@contextmanager
+def phase(name):
+    """Attributes all memory allocated within this context to the phase `name`."""
+    if profiler is None or not profiler.running:
+        yield
+        return
+    profiler.enter_phase(name)
+    try:
+        yield
+    finally:
+        profiler.exit_phase()
+
+
+class MemoryProfiler(ABC):
+    def __init__(self):
+        self.running = False
+        self._phases = []
+        self._peaks = {}
+        self._start = self._total_peak = 0
+
+    def start(self):
+        self._start = self._total_peak = self._current()
+        self._phases = [(DEFAULT_PHASE, self._start)]
+        self._peaks = {}
+        self.running = True
+
+    def stop(self) -> Tuple[int, Dict[str, int]]:
+        """Stops profiling the current test.
+
+        Returns:
+            Total memory increase (peak - start) in bytes and the increase per phase.
+        """
+        self._track_peak()
+        self.running = False
+        return self._total_peak - self._start, dict(self._peaks)
+
+    def enter_phase(self, name):
+        self._track_peak()
+        self._phases.append((name, self._current()))
+
+    def exit_phase(self):
+        self._track_peak()
+        self._phases.pop()
+        # Restart the enclosing phase so that the finished phase's memory is not attributed to it:
+        name, _ = self._phases.pop()
+        self._phases.append((name, self._current()))
+
+    def _track_peak(self):
+        name, start = self._phases[-1]
+        peak = self._peak()
+        self._total_peak = max(self._total_peak, peak)
+        self._peaks[name] = max(self._peaks.get(name, 0), peak - start)
+
+    @abstractmethod
+    def _current(self) -> int:
+        pass
+
+    @abstractmethod
+    def _peak(self) -> int:
+        pass
+
+
+class TracemallocProfiler(MemoryProfiler):
+    """Exact peak of the memory allocated by Python (slows down allocations though)."""
+
+    def start(self):
+        tracemalloc.start()
+        super().start()
+
+    def stop(self):
+        peaks = super().stop()
+        tracemalloc.stop()
+        return peaks
+
+    def enter_phase(self, name):
+        super().enter_phase(name)
+        tracemalloc.reset_peak()
+
+    def exit_phase(self):
+        super().exit_phase()
+        tracemalloc.reset_peak()
+
+    def _current(self):
+        return tracemalloc.get_traced_memory()[0]
+
+    def _peak(self):
+        return tracemalloc.get_traced_memory()[1]
+
+
+class SamplingProfiler(MemoryProfiler):
+    """Samples a memory metric in a single long-lived background thread and keeps the high-water mark.
+    Phase boundaries are sampled synchronously, so even short phases get at least two samples.
+    """
+
+    def __init__(self, interval=0.01):
+        super().__init__()
+        self._interval = interval
+        self._lock = threading.RLock()
+        self._high_water_mark = 0
+        self._sampler = threading.Thread(target=self._sample_forever, name='memprof-sampler', daemon=True)
+        self._sampler.start()
+
+    def _sample_forever(self):
+        while True:
+            if self.running:
+                self._sample()
+            time.sleep(self._interval)
+
+    def _sample(self):
+        value = self.measure()
+        with self._lock:
+            self._high_water_mark = max(self._high_water_mark, value)
+        return value
+
+    def start(self):
+        with self._lock:
+            super().start()
+
+    def stop(self):
+        with self._lock:
+            return super().stop()
+
+    def enter_phase(self, name):
+        with self._lock:
+            super().enter_phase(name)
+
+    def exit_phase(self):
+        with self._lock:
+            super().exit_phase()
+
+    def _current(self):
+        with self._lock:
+            self._high_water_mark = self._sample()
+            return self._high_water_mark
+
+    def _peak(self):
+        with self._lock:
+            self._sample()
+            return self._high_water_mark
+
+    @abstractmethod
+    def measure(self) -> int:
+        pass
+
+
+class RssProfiler(SamplingProfiler):
+    """Resident set size of the test process itself."""
+
+    def __init__(self, interval=0.01):
+        self._process = psutil.Process()
+        super().__init__(interval)
+
+    def measure(self):
+        return self._process.memory_info().rss
+
+
+class SystemProfiler(SamplingProfiler):
+    """System-wide used memory (the original pytest-memprof approach, affected by all other processes)."""
+
+    def measure(self):
+        return -psutil.virtual_memory().available
+
+
+def create_profiler(mode, interval=0.01) -> MemoryProfiler:
+    if mode == 'tracemalloc':
+        return TracemallocProfiler()
+    return {'rss': RssProfiler, 'system': SystemProfiler}[mode](interval)
@@ -185,3 +185,14 @@ class TestAlgorithmIntegration:
         set_a = {i for i in range(importer.last_import_metainfo.matching_group_no)}
         set_b = {i for i in range(importer.last_import_metainfo.matching_group_no, len(graph))}
         assert len(graph.max_matchings(set_a, set_b)) == 99
+
+    def test_matching_import_graph(self, importer, create_backend):
+        graph, meta_info = importer.import_graph(create_backend(), "Matching_100_100.mmim", False)
+        set_a = {i for i in range(meta_info.matching_group_no)}
+        set_b = {i for i in range(meta_info.matching_group_no, len(graph))}
+        assert len(graph.max_matchings(set_a, set_b)) == 100
+
+        graph, meta_info = importer.import_graph(create_backend(), "Matching2_100_100.mmim", False)
+        set_a = {i for i in range(meta_info.matching_group_no)}
+        set_b = {i for i in range(meta_info.matching_group_no, len(graph))}
+        assert len(graph.max_matchings(set_a, set_b)) == 99
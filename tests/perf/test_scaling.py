@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from tests.perf import generators
+from tests.perf.memprof import phase
+
+SEED = 42
+
+# Algorithm -> (how to run it, graph types to run it on):
+ALGORITHMS = {
+    'kruskal': (lambda graph: graph.perform_kruskal(), ('sparse', 'dense', 'complete', 'grid')),
+    'prim': (lambda graph: graph.perform_prim(), ('sparse', 'dense', 'complete', 'grid')),
+    'dijkstra': (lambda graph: graph.perform_dijkstra(0), ('sparse', 'dense', 'grid')),
+    'edmonds-karp': (lambda graph: graph.perform_edmonds_karp(0, len(graph) - 1), ('flow', 'bipartite')),
+    'successive-shortest-path': (lambda graph: graph.perform_successive_shortest_path(), ('flow',)),
+}
+
+# The flow algorithms are orders of magnitude slower, so they run on proportionally smaller graphs:
+SIZE_FACTORS = {'edmonds-karp': 0.1, 'successive-shortest-path': 0.05}
+
+
+class TestScaling:
+    """ Measures how the algorithms scale on seeded synthetic graphs of growing size (see `--scaling-sizes`).
+    The time and memory per size and the fitted growth exponents are reported at the end of the session.
+    """
+
+    @pytest.mark.parametrize('algorithm, graph_type', [(algorithm, graph_type)
+                                                       for algorithm, (_, graph_types) in ALGORITHMS.items()
+                                                       for graph_type in graph_types])
+    def test_scaling(self, create_backend, algorithm, graph_type, scaling_size, record_scaling):
+        run, _ = ALGORITHMS[algorithm]
+        edge_count = max(10, int(scaling_size * SIZE_FACTORS.get(algorithm, 1)))
+        with phase('import'):
+            graph = generators.build(create_backend(), generators.GENERATORS[graph_type], edge_count, SEED)
+
+        start = time.perf_counter()
+        result = run(graph)
+        record_scaling(algorithm, graph_type, edge_count, time.perf_counter() - start)
+
+        if algorithm in ('kruskal', 'prim'):
+            assert result > 0
+        elif algorithm == 'dijkstra':
+            assert len(result) == len(graph)  # All generated graphs of this kind are connected
+        else:
+            assert result.max_flow > 0
@@ -0,0 +1,63 @@
+import pytest
+
+from grapresso.backends.api import EdgeAlreadyExistsError
+from grapresso.components.edge import Edge
+from grapresso.components.graph import DiGraph
+from grapresso_cli.backends.csr import CsrBackend
+
+
+class TestCsrBackend:
+    @pytest.fixture
+    def graph(self):
+        graph = DiGraph(CsrBackend())
+        for name in range(5):
+            graph.add_node(name, balance=0.0)
+        for u, v, cost in ((0, 4, 1.0), (0, 2, 2.0), (0, 3, 3.0), (0, 1, 4.0), (3, 0, 5.0)):
+            graph.add_edge(u, v, cost=cost)
+        return graph
+
+    def test_views_have_no_dict(self, graph):
+        node = graph.backend[0]
+        edge = node.edge(4)
+        assert not hasattr(node, '__dict__') and not hasattr(edge, '__dict__')
+        with pytest.raises(AttributeError):
+            node.flow = 1.0
+        assert isinstance(edge, Edge) and edge.flow is None
+
+    def test_edge_lookup(self, graph):
+        node = graph.backend[0]
+        assert [e.to_node.name for e in node.edges] == [4, 2, 3, 1]
+        assert node.edge(4).cost == 1.0 and node[graph.backend[2]].cost == 2.0 and node.edge(1).cost == 4.0
+        for missing in (0, 7):
+            with pytest.raises(KeyError):
+                node.edge(missing)
+
+        graph.backend.remove_edge(0, 4)
+        with pytest.raises(KeyError):
+            node.edge(4)
+        graph.add_edge(0, 4, cost=6.0)
+        assert node.edge(4).cost == 6.0 and [e.to_node.name for e in node.edges] == [2, 3, 1, 4]
+
+    def test_rejects_duplicates_and_node_removal(self, graph):
+        backend = graph.backend
+        with pytest.raises(EdgeAlreadyExistsError):
+            graph.add_edge(0, 4, cost=6.0)
+        with pytest.raises(EdgeAlreadyExistsError):
+            backend.add_edge(4, 0, symmetric=True)  # (0, 4) exists
+        with pytest.raises(EdgeAlreadyExistsError):
+            backend.add_edges_from(((1, 2, 6.0, 0.0), (2, 1, 7.0, 0.0)), symmetric=True)
+        assert len(backend.edges()) == 5 and backend.find_position(1, 2) is None
+        with pytest.raises(TypeError):
+            graph.remove_node(4)
+
+    def test_batched_changes(self, graph):
+        backend = graph.backend
+        backend.remove_edge(0, 2)
+        graph.add_edge(2, 0, cost=6.0)
+        graph.add_edge(4, 3, cost=7.0)
+        assert backend.find_position(0, 2) is None and backend[2].edge(0).cost == 6.0
+        backend.flush()
+        assert [(e.from_node.name, e.to_node.name) for e in backend.edges()] == [
+            (0, 4), (0, 3), (0, 1), (2, 0), (3, 0), (4, 3)]
+        sources, targets, costs, _, _ = backend.data
+        assert len(sources) == 6 and sorted(costs) == [1.0, 3.0, 4.0, 5.0, 6.0, 7.0]
@@ -1,4 +1,15 @@
+import io
+import json
+import os
+import pstats
+import subprocess
+import sys
+
+import pytest
+
 import grapresso_cli.mmi_cli as cli
+import grapresso_cli.server as cli_server
+from grapresso_cli import footprint, multi_source, report, streaming
 
 
 class TestCLI:
@@ -7,3 +18,230 @@ class TestCLI:
                           "--backends mem --methods 3*prim 3*kruskal".split())
         assert round(results['G_1_2.mmiw']['mem']['prim']['return'], 3) == 286.711
         assert round(results['G_1_2.mmiw']['mem']['kruskal']['return'], 3) == 286.711
+
+    def test_cli_stream_backend(self, monkeypatch):
+        results = cli.run("G_1_2.mmiw big.mmi --symmetric "
+                          "--backends stream --methods count-components kruskal".split())
+        assert results['G_1_2.mmiw']['stream']['count-components']['return'] == 1
+        assert round(results['G_1_2.mmiw']['stream']['kruskal']['return'], 3) == 286.711
+        assert results['big.mmi']['stream']['count-components']['return'] == 222
+        monkeypatch.setattr(streaming, 'SORT_RUN_SIZE', 300)  # Sorts G_1_2's 2000 edges in 7 runs on disk
+        merged = cli.run("G_1_2.mmiw --symmetric --backends stream --methods kruskal".split())
+        assert round(merged['G_1_2.mmiw']['stream']['kruskal']['return'], 3) == 286.711
+
+    def test_cli_parallel_jobs(self):
+        results = cli.run("K_12.mmiw K_10.mmiw --symmetric "
+                          "--backends mem mem-optper --methods 2*kruskal double-tree --jobs 2".split())
+        assert list(results) == ['K_12.mmiw', 'K_10.mmiw']
+        for backend in ('mem', 'mem-optper'):
+            assert round(results['K_10.mmiw'][backend]['kruskal']['return'], 2) == 31.23
+            assert isinstance(results['K_10.mmiw'][backend]['double-tree']['return'], str)
+
+    def test_cli_csr_backend(self):
+        results = cli.run("G_1_2.mmiw --symmetric --backends csr mem-optmem --methods kruskal prim count-components "
+                          "--graph-size".split())['G_1_2.mmiw']
+        for method in ('kruskal', 'prim'):
+            assert round(results['csr'][method]['return'], 3) == 286.711
+            assert round(results['mem-optmem'][method]['return'], 3) == 286.711
+        assert results['csr']['count-components']['return'] == 1
+        graph_sizes = {backend: results[backend]['kruskal']['graph']['graph_size'] for backend in results}
+        assert graph_sizes['csr'] < graph_sizes['mem-optmem']
+        assert all(results[backend]['kruskal']['graph']['edges'] == 2000 for backend in results)
+
+    def test_cli_shared_backend(self):
+        for jobs in ('1', '2'):
+            results = cli.run("K_10.mmiw --symmetric --backends shm mem --methods kruskal prim double-tree "
+                              "--jobs {}".format(jobs).split())['K_10.mmiw']
+            assert list(results['shm']) == ['kruskal', 'prim', 'double-tree']
+            for method in ('kruskal', 'prim'):
+                assert round(results['shm'][method]['return'], 2) == 31.23 == round(results['mem'][method]['return'], 2)
+
+    def test_cli_profile(self, tmp_path, monkeypatch):
+        imports, build_graph = [], cli.build_graph
+        monkeypatch.setattr(cli, 'build_graph', lambda *args: imports.append(args) or build_graph(*args))
+        for profiler in ('cprofile', 'sample'):
+            result = cli.run("K_10.mmiw --symmetric --backends mem --methods 3*kruskal "
+                             "--profile {} --profile-dir {}".format(profiler, tmp_path).split())
+            assert len(result['K_10.mmiw']['mem']['kruskal']['runs']) == 3
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            'K_10.mmiw.mem.import.collapsed', 'K_10.mmiw.mem.import.pstats',
+            'K_10.mmiw.mem.kruskal.collapsed', 'K_10.mmiw.mem.kruskal.pstats']
+        calls = {func: stats[1] for (_, _, func), stats
+                 in pstats.Stats(str(tmp_path / 'K_10.mmiw.mem.kruskal.pstats')).stats.items()}
+        assert calls['perform_kruskal'] == 1  # Only the extra run is profiled, none of the timed ones
+        assert len(imports) == 4  # The timed import is not profiled either, but repeated with the profiler
+
+    def test_cli_result_cache(self, tmp_path):
+        arguments = "K_10.mmiw --symmetric --backends mem csr --methods 2*kruskal count-components " \
+                    "--result-cache-dir {} ".format(tmp_path)
+        timed = cli.run(arguments.split())['K_10.mmiw']
+        assert 'cached' not in timed['mem']['kruskal'] and len(timed['mem']['kruskal']['runs']) == 2
+
+        # The results of the timing runs are looked up, no matter which backend stores the graph:
+        results = cli.run((arguments + "--results-only").split())['K_10.mmiw']
+        for backend in ('mem', 'csr'):
+            assert results[backend]['kruskal'] == {'return': timed['mem']['kruskal']['return'], 'cached': True,
+                                                   'graph': results[backend]['kruskal']['graph']}
+            assert results[backend]['count-components']['return'] == 1
+        assert not cli.run("K_12.mmiw --symmetric --backends mem --methods kruskal "
+                           "--results-only".split())['K_12.mmiw']['mem']['kruskal']['cached']
+
+    def test_cli_report_and_compare(self, tmp_path):
+        baseline = str(tmp_path / "baseline.csv")
+        cli.run("K_10.mmiw --symmetric --backends mem --methods 3*kruskal --report csv {}".format(baseline).split())
+
+        records = report.read_report(baseline)
+        assert len(records) == 1 and len(records[0]['runs']) == 3
+        assert records[0]['method'] == 'kruskal' and records[0]['nodes'] == 10
+        assert 0 < records[0]['peak_memory'] < 1024 ** 2  # Of kruskal on K_10, not of the whole process
+
+        cli.run("K_10.mmiw --symmetric --backends mem --methods 3*kruskal "
+                "--compare {} --compare-threshold 1000".format(baseline).split())
+        with pytest.raises(SystemExit) as exit_info:
+            cli.run("K_10.mmiw --symmetric --backends mem --methods 3*kruskal "
+                    "--compare {} --compare-threshold -1".format(baseline).split())
+        assert exit_info.value.code == 1
+
+    def test_cli_adaptive_repetitions(self):
+        result = cli.run("K_10.mmiw --symmetric --backends mem --methods 3*kruskal "
+                         "--warmup 2 --no-gc --target-ci 0.0001 --max-runs 20".split())['K_10.mmiw']['mem']['kruskal']
+        assert 3 <= len(result['runs']) <= 20 and result['warmup'] == 2
+        assert result['fastest'] <= result['median'] <= result['slowest']
+        assert result['iqr'] >= 0 and result['stdev'] >= 0
+        for budget in ("--time-budget 1", "--max-runs 20"):
+            with pytest.raises(SystemExit):
+                cli.run("K_10.mmiw --symmetric --backends mem --methods kruskal {}".format(budget).split())
+
+    def test_cli_deltas(self, tmp_path):
+        first, second = tmp_path / "1.delta", tmp_path / "2.delta"
+        first.write_text("~ 0 1 0.5\n")
+        second.write_text("- 0 1\n+ 0 1 100\n")
+        first, second = str(first), str(second)
+        results = cli.run("K_10.mmiw --symmetric --backends mem csr --methods kruskal --results-only "
+                          "--deltas {} {}".format(first, second).split())
+        assert list(results) == ['K_10.mmiw', 'K_10.mmiw + ' + first, 'K_10.mmiw + ' + second]
+        costs = [round(results[step]['mem']['kruskal']['return'], 2) for step in results]
+        assert costs[0] == 31.23 and costs[1] < costs[0] and costs[2] > costs[1]
+        assert all(results[step]['csr']['kruskal']['return'] == results[step]['mem']['kruskal']['return']
+                   for step in results)
+        # Applying a delta invalidates the results of the previous graph version, so only the last one is shared:
+        assert [results[step]['csr']['kruskal']['cached'] for step in results] == [False, False, True]
+
+    def test_cli_multi_source(self, tmp_path):
+        table = cli.run("K_10.mmiw --symmetric --backends mem --methods dijkstra --start 3 "
+                        "--results-only".split())['K_10.mmiw']['mem']['dijkstra']['return']
+        expected = {node.name: entry.dist for node, entry in table.items()}
+        results = cli.run("K_10.mmiw --symmetric --backends mem shm --methods dijkstra mbf --sources all "
+                          "--source-jobs 2 --results-only".split())['K_10.mmiw']
+        for backend in ('mem', 'shm'):
+            for method in ('dijkstra', 'mbf'):
+                rows = results[backend][method]['return']
+                assert list(rows) == list(range(10))
+                assert rows[3] == pytest.approx([expected[node] for node in range(10)])
+
+        for output_format in multi_source.OUTPUT_FORMATS:
+            cell = cli.run("K_10.mmiw --symmetric --backends csr --methods mbf --sources 7 0:2 "
+                           "--distances {} {}".format(output_format, tmp_path).split())['K_10.mmiw']['csr']['mbf']
+            assert cell['return'] == 3
+        written = list(multi_source.read_binary_rows(str(tmp_path / 'K_10.mmiw.csr.mbf.bin')))
+        assert [(source, row.tolist()) for source, row in written] == [(s, rows[s]) for s in (7, 0, 1)]
+        lines = (tmp_path / 'K_10.mmiw.csr.mbf.csv').read_text().splitlines()
+        assert len(lines) == 4 and lines[0].startswith('source,0,1') and lines[1].startswith('7,')
+
+        with pytest.raises(ValueError, match="not a node"):
+            cli.run("K_10.mmiw --backends mem --methods dijkstra --sources 10".split())
+        for arguments in ("--backends mem --methods dijkstra kruskal", "--backends stream --methods kruskal"):
+            with pytest.raises(SystemExit):
+                cli.run("K_10.mmiw --sources 0 {}".format(arguments).split())
+
+    def test_cli_multi_source_result_cache(self, tmp_path, monkeypatch):
+        arguments = "K_10.mmiw --symmetric --backends mem --methods dijkstra --results-only --result-cache-dir {} " \
+                    "--sources ".format(tmp_path)
+        assert not cli.run((arguments + "0:2").split())['K_10.mmiw']['mem']['dijkstra']['cached']
+        with monkeypatch.context() as patch:
+            patch.setattr(multi_source, 'MultiSourceRunner', None)  # A cache hit does not set up a runner
+            assert cli.run((arguments + "0:2").split())['K_10.mmiw']['mem']['dijkstra']['cached']
+        monkeypatch.setattr(multi_source, 'MAX_CACHED_DISTANCES', 50)
+        for _ in range(2):
+            large = cli.run((arguments + "all").split())['K_10.mmiw']['mem']['dijkstra']
+        assert not large['cached'] and len(large['return']) == 10
+
+    def test_cli_memory_limit(self, tmp_path):
+        estimate = footprint.estimate_import(os.path.join(cli.parser.get_default('base_dir'), 'big.mmi'), 'csr')
+        assert estimate.node_count == 100000 and estimate.edge_count == pytest.approx(300000, rel=0.01)
+
+        results = cli.run("K_10.mmiw G_1_20.mmiw --symmetric --backends mem --methods kruskal "
+                          "--memory-limit 1".split())
+        assert round(results['K_10.mmiw']['mem']['kruskal']['return'], 2) == 31.23
+        assert results['G_1_20.mmiw']['mem'] == {}  # Refused
+
+        expected = cli.run("G_1_20.mmiw --symmetric --backends csr --methods kruskal "
+                           "--graph-size exact".split())['G_1_20.mmiw']['csr']['kruskal']
+        results = cli.run("G_1_20.mmiw --symmetric --backends mem csr --methods kruskal --graph-size --memory-limit 1 "
+                          "--over-limit mmap --spill-dir {}".format(tmp_path).split())['G_1_20.mmiw']
+        for backend in ('mem', 'csr'):
+            assert results[backend]['kruskal']['graph']['storage'] == 'mmap'
+            assert results[backend]['kruskal']['return'] == expected['return']
+        assert list(tmp_path.iterdir()) == []  # The memory-mapped files are gone
+        estimated_size = cli.run("G_1_20.mmiw --symmetric --backends csr --methods kruskal "
+                                 "--graph-size".split())['G_1_20.mmiw']['csr']['kruskal']['graph']['graph_size']
+        assert estimated_size == pytest.approx(expected['graph']['graph_size'], rel=0.1)
+
+    @pytest.mark.skipif(len(os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else range(os.cpu_count())) < 2,
+                        reason="--jobs runs at most one worker per core")
+    def test_cli_memory_limit_is_divided_between_jobs(self):
+        arguments = "G_1_2.mmiw K_10.mmiw --symmetric --backends mem --methods kruskal --memory-limit 2"
+        assert cli.run(arguments.split())['G_1_2.mmiw']['mem']
+        results = cli.run((arguments + " --jobs 2").split())
+        assert results['G_1_2.mmiw']['mem'] == {}  # Refused, each of both workers may only use 1 MB
+        assert results['K_10.mmiw']['mem']
+
+    def test_cli_compare_refuses_other_storage(self, tmp_path):
+        baseline, mapped = str(tmp_path / "baseline.csv"), str(tmp_path / "mapped.json")
+        cli.run("G_1_20.mmiw --symmetric --backends mem --methods kruskal --report csv {}".format(baseline).split())
+        arguments = "G_1_20.mmiw --symmetric --backends mem --methods kruskal --memory-limit 1 --over-limit mmap " \
+                    "--spill-dir {} --report json {} --compare {} --compare-threshold 1000".format(
+                        tmp_path, mapped, baseline)
+        with pytest.raises(SystemExit) as exit_info:
+            cli.run(arguments.split())
+        assert exit_info.value.code == 1
+        assert [r['storage'] for r in report.read_report(mapped)] == ['mmap']
+        assert report.read_report(baseline)[0]['storage'] is None
+
+    def test_cli_serve(self, tmp_path):
+        requests = [{'id': 1, 'cmd': 'load', 'slot': 'k', 'file': 'K_10.mmiw', 'backend': 'csr', 'symmetric': True},
+                    {'id': 2, 'cmd': 'load', 'slot': 'g', 'file': 'G_1_2.mmiw', 'backend': 'mem', 'symmetric': True},
+                    {'id': 3, 'cmd': 'run', 'slot': 'k', 'methods': ['2*kruskal', 'dijkstra'], 'start': 3},
+                    {'id': 4, 'cmd': 'run', 'slot': 'g', 'methods': ['prim'], 'options': ['--results-only']},
+                    {'id': 5, 'cmd': 'run', 'slot': 'missing', 'methods': ['prim']},
+                    {'id': 7, 'cmd': 'run', 'slot': 'g', 'methods': ['prim'], 'options': ['--no-gc']},
+                    {'cmd': 'shutdown'},
+                    {'id': 6, 'cmd': 'run', 'slot': 'k', 'methods': ['prim']}]
+        server = cli_server.GraphServer(cli.parser.get_default('base_dir'), workers=2)
+        output = io.StringIO()
+        try:
+            cli_server.serve_lines(server, [json.dumps(request) for request in requests] + ["no json"], output)
+        finally:
+            server.close()
+        responses = {response['id']: response for response in map(json.loads, output.getvalue().splitlines())}
+
+        assert sorted(responses, key=str) == [1, 2, 3, 4, 5, 7, None]  # Requests after the shutdown are ignored
+        assert responses[1]['graph']['nodes'] == 10
+        kruskal = responses[3]['results']['K_10.mmiw']['csr']['kruskal']
+        assert round(kruskal['return'], 2) == 31.23 and len(kruskal['runs']) == 2
+        assert 'dijkstra' in responses[3]['results']['K_10.mmiw']['csr']
+        assert round(responses[4]['results']['G_1_2.mmiw']['mem']['prim']['return'], 3) == 286.711
+        assert not responses[5]['ok'] and "missing" in responses[5]['error']
+        assert not responses[7]['ok'] and "--no-gc" in responses[7]['error']  # Not with 2 workers
+
+    def test_cli_lazy_imports(self):
+        code = "import sys, grapresso_cli.mmi_cli as cli; " \
+               "cli.run('big.mmi --symmetric --backends stream --methods kruskal --startup-trace'.split()); " \
+               "print([module for module in ('grapresso', 'networkx') if module in sys.modules])"
+        output = subprocess.run([sys.executable, '-c', code], cwd='..', stdout=subprocess.PIPE,
+                                universal_newlines=True, check=True).stdout
+        assert "Startup trace (imports):" in output and "grapresso_cli.streaming" in output
+        assert output.splitlines()[-1] == '[]'
+
+        results = cli.run("K_10.mmiw --symmetric --backends nx mem --methods kruskal".split())['K_10.mmiw']
+        assert round(results['nx']['kruskal']['return'], 2) == round(results['mem']['kruskal']['return'], 2) == 31.23
@@ -0,0 +1,135 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from grapresso.backends.api import EdgeAlreadyExistsError
+from grapresso.backends.memory import InMemoryBackend
+from grapresso_cli import footprint, result_cache
+from grapresso_cli.importer import mmi_cache
+from grapresso_cli.importer.mmi_importer import MmiImporter
+
+
+class TestMmiImporter:
+    @pytest.mark.parametrize('file_name', ["G_1_2.mmiw", "flow.mmic", "costminflow3.mmibwc", "Matching_100_100.mmim"])
+    @pytest.mark.parametrize('directed', [False, True])
+    def test_bulk_import_matches_line_import(self, importer, file_name, directed):
+        def edges(graph):
+            return [(e.from_node.name, e.to_node.name, e.cost, e.capacity) for e in graph.backend.edges()]
+
+        by_line = importer.read_graph_by_line(InMemoryBackend(), file_name, directed)
+        line_meta_info = importer.last_import_metainfo
+        bulk = importer.read_graph(InMemoryBackend(), file_name, directed)
+
+        assert importer.last_import_metainfo == line_meta_info
+        assert [n.balance for n in bulk.backend] == [n.balance for n in by_line.backend]
+        assert edges(bulk) == edges(by_line)
+
+    def test_cache_roundtrip_and_invalidation(self, tmp_path):
+        source = tmp_path / "costminflow3.mmibwc"
+        source.write_bytes(open("../grapresso_cli/res/example-graphs/costminflow3.mmibwc", 'rb').read())
+        importer = MmiImporter(str(tmp_path), use_cache=True)
+        cache_file = mmi_cache.cache_path(str(source))
+
+        parsed = importer.parse(source.name)
+        assert os.path.exists(cache_file)
+        cached = mmi_cache.load(cache_file, os.stat(str(source)))
+        assert cached is not None
+        assert cached.meta_info == parsed.meta_info and cached.node_count == parsed.node_count
+        for column in ('balances', 'sources', 'targets', 'costs', 'capacities'):
+            assert list(getattr(cached, column)) == list(getattr(parsed, column))
+        assert importer.read_graph(InMemoryBackend(), source.name, True).perform_successive_shortest_path().cost == 1537
+
+        with source.open('ab') as file:
+            file.write(b"0\t1\t1.0\t1.0\n")
+        assert mmi_cache.load(cache_file, os.stat(str(source))) is None
+        assert len(importer.parse(source.name).sources) == len(parsed.sources) + 1
+
+    def test_iter_nodes_and_edges(self, importer):
+        parsed = importer.parse("costminflow3.mmibwc")
+        assert list(importer.iter_nodes("costminflow3.mmibwc")) == list(enumerate(parsed.balances))
+        assert list(importer.iter_edges("costminflow3.mmibwc")) == list(zip(parsed.sources, parsed.targets,
+                                                                            parsed.costs, parsed.capacities))
+        assert importer.read_header("Matching_100_100.mmim") == (200, importer.parse("Matching_100_100.mmim").meta_info)
+
+    def test_scan_dir_filters_by_extension(self, importer):
+        file_names = importer.scan_dir(ext=('mmic',))
+        assert sorted(file_names) == ['G_1_2.mmic', 'flow-small.mmic', 'flow.mmic', 'flow2.mmic']
+        assert 'big.mmi' in importer.scan_dir() and not any(fn.endswith('.bin') for fn in importer.scan_dir())
+
+    def test_import_dir(self, importer):
+        def edges(graph):
+            return [(e.from_node.name, e.to_node.name, e.cost, e.capacity) for e in graph.backend.edges()]
+
+        imported = {name: (graph, meta_info) for name, graph, meta_info
+                    in importer.import_dir(InMemoryBackend, ext=('mmic', 'mmibwc'), is_directed=True, max_workers=2)}
+        assert sorted(imported) == sorted(importer.scan_dir(ext=('mmic', 'mmibwc')))
+        for name, (graph, meta_info) in imported.items():
+            expected = importer.read_graph(InMemoryBackend(), name, True)
+            assert meta_info == importer.last_import_metainfo
+            assert edges(graph) == edges(expected)
+
+    def test_import_graphs_shares_one_importer(self, tmp_path):
+        importer = MmiImporter("../grapresso_cli/res/example-graphs/", use_cache=True, cache_dir=str(tmp_path))
+        file_names = ["Matching_100_100.mmim", "Matching2_100_100.mmim", "costminflow3.mmibwc", "G_1_2.mmic"] * 4
+        imported = list(importer.import_graphs(InMemoryBackend, file_names, max_workers=8))
+        assert [meta_info for _, meta_info in imported] == [importer.import_graph(InMemoryBackend(), fn).meta_info
+                                                            for fn in file_names]
+        assert [imported[i].meta_info.matching_group_no for i in range(2)] == [100, 100]
+        assert all(len(graph) == len(importer.read_graph(InMemoryBackend(), fn)) for fn, (graph, _)
+                   in zip(file_names, imported))
+        assert importer.last_import_metainfo == importer.import_graph(InMemoryBackend(), file_names[-1]).meta_info
+
+    @pytest.mark.parametrize('directed', [False, True])
+    def test_edge_count(self, importer, create_backend, directed):
+        graph = importer.read_graph(create_backend(), "G_1_2.mmiw", directed)
+        assert footprint.edge_count(graph, not directed) == len(importer.parse("G_1_2.mmiw").sources)
+
+    @pytest.mark.parametrize('directed', [False, True])
+    def test_apply_delta(self, importer, create_mutable_backend, tmp_path, directed):
+        def edges(graph):
+            return sorted((e.from_node.name, e.to_node.name, e.cost) for e in graph.backend.edges())
+
+        lines = Path("../grapresso_cli/res/example-graphs/K_10.mmiw").read_text().splitlines()
+        expected_file = tmp_path / "K_10_changed.mmiw"
+        expected_file.write_text("\n".join(["11", "0\t2\t1.5"] + lines[3:] + ["0\t10\t2.0"]))
+        delta_file = tmp_path / "K_10.delta"
+        delta_file.write_text("# Replace (0, 1) by (0, 10) and make (0, 2) cheaper\n- 0 1\n\n~ 0 2 1.5\n+ 0 10 2.0 0\n")
+
+        graph = importer.read_graph(create_mutable_backend(), "K_10.mmiw", directed)
+        cache = result_cache.ResultCache()
+        content_hash = result_cache.graph_hash(graph)
+        cache.call(content_hash, 'kruskal', graph.perform_kruskal)
+        applied = importer.apply_delta(graph, str(delta_file), cache)
+
+        expected = importer.read_graph(create_mutable_backend(), str(expected_file), directed)
+        assert applied[:3] == (1, 1, 1)
+        assert edges(graph) == edges(expected)
+        assert graph.perform_kruskal() == expected.perform_kruskal()
+        assert applied.content_hash != content_hash
+        assert not cache.get(result_cache.result_key(content_hash, 'kruskal'))[0]
+        with pytest.raises(KeyError):
+            importer.apply_delta(graph, str(delta_file))  # (0, 1) does not exist anymore
+
+    @pytest.mark.parametrize('directed', [False, True])
+    def test_apply_delta_removes_one_parallel_edge(self, importer, create_mutable_backend, tmp_path, directed):
+        def costs(graph):
+            return sorted(e.cost for e in graph.backend.edges() if {e.from_node.name, e.to_node.name} == {0, 1})
+
+        graph = importer.read_graph(create_mutable_backend(), "K_10.mmiw", directed)
+        original_costs = costs(graph)
+        add_file, remove_file = tmp_path / "add.delta", tmp_path / "remove.delta"
+        add_file.write_text("+ 0 1 7.0\n")
+        remove_file.write_text("- 0 1\n")
+
+        try:
+            importer.apply_delta(graph, str(add_file))
+        except EdgeAlreadyExistsError:
+            pytest.skip("The backend rejects parallel edges")
+        if len(costs(graph)) == len(original_costs):
+            pytest.skip("The backend does not store parallel edges")
+        importer.apply_delta(graph, str(remove_file))
+        # The first (original) edge is removed, the one added by the delta remains:
+        assert costs(graph) == [7.0] * len(original_costs)
+        importer.apply_delta(graph, str(remove_file))
+        assert costs(graph) == []